@@ -1,30 +1,900 @@
 import sys
 import os
+import math
+import time
+from collections import OrderedDict
 from typing import List
 from PyQt5.QtWidgets import (
     QApplication, QLabel, QPushButton, QFileDialog, QVBoxLayout, QHBoxLayout,
-    QWidget, QListWidget, QListWidgetItem, QSizePolicy, QComboBox, QSplitter,
+    QWidget, QListView, QSizePolicy, QComboBox, QSplitter,
     QGroupBox, QSpinBox, QFormLayout, QShortcut
 )
-from PyQt5.QtGui import QPixmap, QPainter, QPen, QColor, QIcon, QKeySequence
-from PyQt5.QtCore import Qt, QRect, QPoint, QSize
-from PIL import Image, ImageDraw
+from PyQt5.QtGui import QPixmap, QPainter, QColor, QIcon, QKeySequence, QImage, QImageReader, QRegion
+from PyQt5.QtCore import (
+    Qt, QRect, QRectF, QPoint, QPointF, QSize, QSizeF, QObject, QRunnable, QThreadPool, QBuffer, QByteArray,
+    QIODevice, QTimer, QFileSystemWatcher, QAbstractListModel, QModelIndex, pyqtSignal
+)
+import numpy as np
+from PIL import Image
+
+from folder_model import FolderModel, processed_names, stat_entry
+from image_cache import LRUCache
+import profiling
+from profiling import span, traced
+from render import BORDER_THICKNESS, border_bands, burn_rects, source_jpeg_options
+from sidecar import append_annotation, load_records, pending_annotations
+from stall_watchdog import StallWatchdog
+from thumbcache import default_cache_path, open_default_cache
+
+THUMB_SIZE = 64
+IMAGE_CACHE_BUDGET = 1024 * 1024 * 1024
+# Images above this many pixels are never decoded whole; they are viewed through the tile pyramid.
+TILED_MIN_PIXELS = 80_000_000
+TILE_SIZE = 512
+TILE_CACHE_BUDGET = 256 * 1024 * 1024
+SMALL_LEVEL_PIXELS = 4 * TILE_SIZE * TILE_SIZE
+# "spans" or "cprofile" starts a profiling session at launch; Ctrl+Shift+P toggles one at any time.
+PROFILE_MODE = os.environ.get("IMAGER_PROFILE", "")
+TRACE_DIR = os.environ.get("IMAGER_TRACE_DIR") or os.path.join(os.path.dirname(default_cache_path()), "traces")
+# Event-loop stalls longer than this are logged with the GUI thread's stack; 0 turns the watchdog off.
+STALL_THRESHOLD_MS = int(os.environ.get("IMAGER_STALL_MS", "250"))
+STALL_LOG = os.path.join(os.path.dirname(default_cache_path()), "stalls.log")
+
+
+@traced("decode.scaled")
+def read_scaled_image(path, max_width, max_height):
+    # Asking the reader for a smaller size lets the JPEG decoder skip work with
+    # DCT scaling (1/2, 1/4, 1/8) instead of decoding every pixel and shrinking.
+    reader = QImageReader(path)
+    size = reader.size()
+    if size.isValid() and (size.width() > max_width or size.height() > max_height):
+        reader.setScaledSize(size.scaled(max_width, max_height, Qt.KeepAspectRatio))
+    return reader.read()
+
+
+def image_bytes(image: QImage):
+    return image.width() * image.height() * image.depth() // 8
+
+
+def image_key(path):
+    # Decoded images are cached under the file's size and mtime as well as its path,
+    # so a file replaced on disk is never shown or saved from the old pixels.
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return path, st.st_size, st.st_mtime_ns
+
+
+def forget_image(cache: LRUCache, path):
+    for key in [k for k in cache.items if k[0] == path]:
+        cache.pop(key)
+
+
+def qimage_to_pil(image: QImage):
+    # Wraps an RGBX8888 QImage's pixel buffer without copying it; the QImage must
+    # stay alive for as long as the returned PIL image is used.
+    ptr = image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    return Image.frombuffer("RGBX", (image.width(), image.height()), ptr, "raw", "RGBX", image.bytesPerLine(), 1)
+
+
+def qimage_array(image: QImage):
+    # H x W x 4 uint8 view onto an RGBX8888 QImage's pixels; writes go straight
+    # into the image. bits() detaches the QImage first if its data is shared.
+    ptr = image.bits()
+    ptr.setsize(image.sizeInBytes())
+    rows = np.frombuffer(ptr, np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4)
+
+
+@traced("render")
+def render_annotated(image: QImage, rects):
+    # The single rendering of burned-in rectangles used for saving and the clipboard.
+    rgbx = image.convertToFormat(QImage.Format_RGBX8888)
+    burn_rects(qimage_array(rgbx), [(r.left(), r.top(), r.width(), r.height()) for r in rects])
+    return rgbx
+
+
+def corner_handles(rect: QRect, hs):
+    return {
+        'tl': QRect(rect.topLeft() - QPoint(hs, hs), QSize(hs * 2, hs * 2)),
+        'tr': QRect(rect.topRight() - QPoint(hs, hs), QSize(hs * 2, hs * 2)),
+        'bl': QRect(rect.bottomLeft() - QPoint(hs, hs), QSize(hs * 2, hs * 2)),
+        'br': QRect(rect.bottomRight() - QPoint(hs, hs), QSize(hs * 2, hs * 2)),
+    }
+
+
+class ThumbnailTask(QRunnable):
+    def __init__(self, loader, generation, path, entry=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.loader = loader
+        self.generation = generation
+        self.path = path
+        self.entry = entry
+
+    def run(self):
+        cache = self.loader.cache
+        entry = self.entry
+        if entry is None:
+            try:
+                entry = stat_entry(*os.path.split(self.path))
+            except OSError:
+                self.loader.finished.emit(self.generation, self.path, QImage())
+                return
+        if cache is not None:
+            data = cache.get(self.path, entry.size, entry.mtime_ns)
+            if data is not None:
+                image = QImage.fromData(data)
+                if not image.isNull():
+                    self.loader.finished.emit(self.generation, self.path, image)
+                    return
+        image = read_scaled_image(self.path, THUMB_SIZE, THUMB_SIZE)
+        if not image.isNull():
+            if cache is not None:
+                data = QByteArray()
+                buffer = QBuffer(data)
+                buffer.open(QIODevice.WriteOnly)
+                image.save(buffer, "JPG", 90)
+                cache.put(self.path, entry.size, entry.mtime_ns, bytes(data))
+        self.loader.finished.emit(self.generation, self.path, image)
+
+
+class BackgroundDecoder(QObject):
+    # Bookkeeping shared by the loaders that decode one task per path on a pool.
+    # cancel() starts a new generation: queued tasks are taken back and dropped,
+    # and results of older generations are ignored when they arrive.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.generation = 0
+        self.pending = {}
+        self.running = {}
+
+    def cancel(self):
+        self.retire_pending()
+        self.generation += 1
+
+    def retire_pending(self):
+        # A task already running must stay referenced until it reports back, or
+        # Python deletes it under the pool.
+        for path, task in self.pending.items():
+            if not self.pool.tryTake(task):
+                self.running[(self.generation, path)] = task
+        self.pending.clear()
+
+    def shutdown(self):
+        self.cancel()
+        self.pool.waitForDone()
+
+    def accept(self, generation, path):
+        # True for a result of the current generation; a stale one only releases its task.
+        if generation != self.generation:
+            self.running.pop((generation, path), None)
+            return False
+        self.pending.pop(path, None)
+        return True
+
+
+class ThumbnailLoader(BackgroundDecoder):
+    # Decodes thumbnails on a worker pool and streams them back to the GUI thread.
+    # A file that can't be decoded is reported with a null image.
+    finished = pyqtSignal(int, str, QImage)
+    thumbnail_ready = pyqtSignal(str, QImage)
+
+    def __init__(self, cache=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.priority = 0
+        self.finished.connect(self._on_finished)
+
+    def request(self, path, entry=None):
+        # Newest requests run first: they are the rows the user is looking at now.
+        # A request still sitting in the queue is pulled back and moved to the front.
+        self.priority += 1
+        task = self.pending.get(path)
+        if task is not None:
+            if self.pool.tryTake(task):
+                self.pool.start(task, self.priority)
+            return
+        task = ThumbnailTask(self, self.generation, path, entry)
+        self.pending[path] = task
+        self.pool.start(task, self.priority)
+
+    def _on_finished(self, generation, path, image):
+        if self.accept(generation, path):
+            self.thumbnail_ready.emit(path, image)
+
+
+class FileListModel(QAbstractListModel):
+    # Flat list of file names for a QListView. With a thumbnail loader, icons are
+    # requested only when the view asks for a row, i.e. when it becomes visible.
+    ICON_CACHE_SIZE = 1024
+
+    def __init__(self, thumbnail_loader=None, parent=None):
+        super().__init__(parent)
+        self.folder = None
+        self.names: List[str] = []
+        self.entries = {}
+        self.row_of = None
+        self.thumbnail_loader = thumbnail_loader
+        self.icons = OrderedDict()
+        if thumbnail_loader is not None:
+            placeholder = QPixmap(THUMB_SIZE, THUMB_SIZE)
+            placeholder.fill(QColor(220, 220, 220))
+            self.placeholder_icon = QIcon(placeholder)
+            thumbnail_loader.thumbnail_ready.connect(self.set_thumbnail)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        name = self.names[index.row()]
+        if role == Qt.DisplayRole:
+            return name
+        if role == Qt.DecorationRole and self.thumbnail_loader is not None:
+            icon = self.icons.get(name)
+            if icon is None:
+                self.thumbnail_loader.request(os.path.join(self.folder, name), self.entries.get(name))
+                return self.placeholder_icon
+            self.icons.move_to_end(name)
+            return icon
+        return None
+
+    def set_names(self, folder, names, entries=None, row_of=None):
+        # `row_of` maps a name to its row without scanning the list (e.g. FolderModel.row).
+        self.beginResetModel()
+        self.folder = folder
+        self.names = list(names)
+        self.entries = entries if entries is not None else {}
+        self.row_of = row_of
+        self.icons.clear()
+        self.endResetModel()
+
+    def insert_name(self, row, name):
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.names.insert(row, name)
+        self.endInsertRows()
+
+    def remove_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        name = self.names.pop(row)
+        self.icons.pop(name, None)
+        self.endRemoveRows()
+
+    def set_thumbnail(self, path, image: QImage):
+        folder, name = os.path.split(path)
+        if folder != self.folder:
+            return
+        # A failed decode keeps the placeholder, so repaints don't request it again.
+        self.icons[name] = self.placeholder_icon if image.isNull() else QIcon(QPixmap.fromImage(image))
+        if len(self.icons) > self.ICON_CACHE_SIZE:
+            self.icons.popitem(last=False)
+        if self.row_of is not None:
+            row = self.row_of(name)
+        else:
+            row = self.names.index(name) if name in self.names else -1
+        if not 0 <= row < len(self.names) or self.names[row] != name:
+            return
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+class DecodeTask(QRunnable):
+    def __init__(self, owner, generation, path):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.owner = owner
+        self.generation = generation
+        self.path = path
+
+    def run(self):
+        # Stat before reading: if the file is replaced meanwhile, the next lookup misses.
+        key = image_key(self.path)
+        reader = QImageReader(self.path)
+        size = reader.size()
+        if key is None or size.width() * size.height() > TILED_MIN_PIXELS:
+            # Shown tile by tile; a whole decode would only crowd out the cache.
+            self.owner.finished.emit(self.generation, self.path, None, QImage())
+            return
+        with span("decode", path=self.path):
+            image = reader.read()
+        self.owner.finished.emit(self.generation, self.path, key, image)
+
+
+class PreviewTask(QRunnable):
+    # Left to the pool to delete once run; a preview that has been superseded by
+    # the time it starts does nothing.
+    def __init__(self, owner, generation, path, max_size: QSize):
+        super().__init__()
+        self.owner = owner
+        self.generation = generation
+        self.path = path
+        self.max_size = max_size
+
+    def run(self):
+        if self.generation != self.owner.generation or self.path != self.owner.preview_path:
+            return
+        image = read_scaled_image(self.path, self.max_size.width(), self.max_size.height())
+        self.owner.preview_finished.emit(self.generation, self.path, image)
+
+
+class ImagePrefetcher(BackgroundDecoder):
+    # Decodes the image being opened and the ones the user is likely to open next
+    # on background threads and drops them into the shared decoded-image cache.
+    # A reduced-size preview of the image being opened can jump the queue.
+    PREVIEW_PRIORITY = 1000
+    finished = pyqtSignal(int, str, object, QImage)
+    preview_finished = pyqtSignal(int, str, QImage)
+    preview_ready = pyqtSignal(str, QImage)
+    image_ready = pyqtSignal(object, QImage)
+
+    def __init__(self, cache: LRUCache, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.pool.setMaxThreadCount(2)
+        self.wanted: List[str] = []
+        self.preview_path = None
+        self.finished.connect(self._on_finished)
+        self.preview_finished.connect(self._on_preview_finished)
+
+    def prefetch(self, paths):
+        # Earlier paths are decoded first; queued decodes are re-ordered to match.
+        self.wanted = list(paths)
+        for path, task in list(self.pending.items()):
+            if self.pool.tryTake(task):
+                if path in self.wanted:
+                    self.pool.start(task, len(self.wanted) - self.wanted.index(path))
+                else:
+                    del self.pending[path]
+        for i, path in enumerate(self.wanted):
+            if path in self.pending:
+                continue
+            key = image_key(path)
+            if key is not None and key not in self.cache:
+                task = DecodeTask(self, self.generation, path)
+                self.pending[path] = task
+                self.pool.start(task, len(self.wanted) - i)
+
+    def preview(self, path, max_size: QSize):
+        self.preview_path = path
+        self.pool.start(PreviewTask(self, self.generation, path, max_size), self.PREVIEW_PRIORITY)
+
+    def cancel(self):
+        self.wanted = []
+        self.preview_path = None
+        super().cancel()
+
+    def _on_preview_finished(self, generation, path, image):
+        if generation == self.generation and path == self.preview_path and not image.isNull():
+            self.preview_ready.emit(path, image)
+
+    def _on_finished(self, generation, path, key, image):
+        if not self.accept(generation, path):
+            return
+        if path in self.wanted and key is not None and not image.isNull():
+            forget_image(self.cache, path)
+            self.cache.put(key, image)
+            self.image_ready.emit(key, image)
+
+
+class TileTask(QRunnable):
+    # Decodes a block of tiles (`cells`, in tile units) of one pyramid level. Left to
+    # the pool to delete once run; the loader only tracks which tiles are pending.
+    def __init__(self, owner, generation, path, level, cells: QRect):
+        super().__init__()
+        self.owner = owner
+        self.generation = generation
+        self.path = path
+        self.level = level
+        self.cells = cells
+
+    def run(self):
+        if not self.owner.still_wanted(self.generation, self.level, self.cells):
+            self.owner.finished.emit(self.generation, self.path, self.level, self.cells, None)
+            return
+        f = 1 << self.level
+        c = self.cells
+        area = QRect(c.x() * TILE_SIZE, c.y() * TILE_SIZE, c.width() * TILE_SIZE, c.height() * TILE_SIZE)
+        area = area.intersected(QRect(QPoint(0, 0), self.owner.level_size(self.level)))
+        # Clipped in source pixels, exactly `f` times the block, Qt hands the reduction
+        # to the JPEG decoder's DCT scaling and skips the rows below the block. A scaled
+        # size that doesn't divide the image would make it decode everything and rescale.
+        reader = QImageReader(self.path)
+        source = QRect(area.x() * f, area.y() * f, area.width() * f, area.height() * f)
+        reader.setClipRect(source.intersected(QRect(QPoint(0, 0), self.owner.size)))
+        reader.setScaledSize(area.size())
+        with span("decode.tiles", level=self.level, cells=c.width() * c.height()):
+            block = reader.read()
+        tiles = {}
+        for row in range(c.top(), c.bottom() + 1):
+            for col in range(c.left(), c.right() + 1):
+                rect = QRect((col - c.x()) * TILE_SIZE, (row - c.y()) * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+                tiles[(col, row)] = block.copy(rect.intersected(block.rect())) if not block.isNull() else QImage()
+        self.owner.finished.emit(self.generation, self.path, self.level, self.cells, tiles)
+
+
+class TileLoader(QObject):
+    # Serves a very large image as a pyramid of power-of-two levels cut into tiles.
+    # Tiles are decoded on demand, only for what is on screen, and kept in a
+    # byte-bounded cache; a tile that failed to decode is cached as a null image.
+    finished = pyqtSignal(int, str, int, QRect, object)
+    tiles_ready = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cache = LRUCache(TILE_CACHE_BUDGET, image_bytes)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.generation = 0
+        self.path = None
+        self.size = QSize()
+        self.levels = 1
+        self.pending = set()
+        self.wanted = set()
+        self.priority = 0
+        self.finished.connect(self._on_finished)
+
+    def open(self, path, size: QSize):
+        self.cancel()
+        self.path = path
+        self.size = size
+        # The top level fits in a single tile.
+        self.levels = 1
+        while max(size.width(), size.height()) > TILE_SIZE << (self.levels - 1):
+            self.levels += 1
+        # Finest level that is decoded whole; it backs the placeholders of finer levels.
+        self.backdrop = self.levels - 1
+        while self.backdrop > 0 and self.is_small(self.backdrop - 1):
+            self.backdrop -= 1
+
+    def level_for(self, scale):
+        # Coarsest level that still has at least one pixel per screen pixel.
+        level = 0
+        while level + 1 < self.levels and scale * (2 << level) <= 1:
+            level += 1
+        return level
+
+    def level_size(self, level):
+        # Rounded down, so every level pixel covers whole source pixels; a level may
+        # leave out less than one of its pixels at the right and bottom edges.
+        return QSize(max(1, self.size.width() >> level), max(1, self.size.height() >> level))
+
+    def tile_rect(self, level, col, row):
+        # Area of the full-resolution image covered by a tile.
+        size = self.level_size(level)
+        w = min(TILE_SIZE, size.width() - col * TILE_SIZE)
+        h = min(TILE_SIZE, size.height() - row * TILE_SIZE)
+        f = 1 << level
+        return QRectF(col * TILE_SIZE * f, row * TILE_SIZE * f, w * f, h * f)
+
+    def is_small(self, level):
+        size = self.level_size(level)
+        return size.width() * size.height() <= SMALL_LEVEL_PIXELS
+
+    def grid(self, level):
+        # Number of tile columns and rows at `level`.
+        size = self.level_size(level)
+        return -(-size.width() // TILE_SIZE), -(-size.height() // TILE_SIZE)
+
+    def cover(self, level, area: QRectF):
+        # (col, row) of every tile at `level` that intersects an image-space area.
+        cols, rows = self.grid(level)
+        span = TILE_SIZE << level
+        cols = range(max(0, int(area.left() // span)), min(cols, int(area.right() // span) + 1))
+        rows = range(max(0, int(area.top() // span)), min(rows, int(area.bottom() // span) + 1))
+        return [(col, row) for row in rows for col in cols]
+
+    def tile(self, level, col, row):
+        return self.cache.get((self.path, level, col, row))
+
+    def request(self, keys):
+        # `keys` are the (level, col, row) tiles the view is missing right now. The
+        # newest requests run first; queued blocks the view has scrolled away from
+        # are skipped when their turn comes.
+        self.wanted = set(keys)
+        self.priority += 1
+        strips = {}
+        for level, col, row in sorted(self.wanted):
+            if (level, col, row) in self.pending:
+                continue
+            if self.is_small(level):
+                # Small levels are decoded whole in a single pass over the file.
+                cols, rows = self.grid(level)
+                self.start(level, QRect(0, 0, cols, rows))
+            else:
+                strips.setdefault((level, row), []).append(col)
+        for (level, row), cols in strips.items():
+            # A JPEG has to be decoded from the top down to reach a row anyway, so a
+            # strip across each contiguous run of missing columns costs about as much
+            # as a single tile.
+            first = prev = cols[0]
+            for col in cols[1:] + [None]:
+                if col is not None and col == prev + 1:
+                    prev = col
+                    continue
+                self.start(level, QRect(first, row, prev - first + 1, 1))
+                first = prev = col
+
+    def start(self, level, cells: QRect):
+        for row in range(cells.top(), cells.bottom() + 1):
+            for col in range(cells.left(), cells.right() + 1):
+                self.pending.add((level, col, row))
+        self.pool.start(TileTask(self, self.generation, self.path, level, cells), self.priority)
+
+    def still_wanted(self, generation, level, cells: QRect):
+        # Called from the worker threads; only reads.
+        wanted = self.wanted
+        return generation == self.generation and any(
+            (level, col, row) in wanted
+            for row in range(cells.top(), cells.bottom() + 1)
+            for col in range(cells.left(), cells.right() + 1)
+        )
+
+    def cancel(self):
+        self.pool.clear()
+        self.pending.clear()
+        self.wanted = set()
+        self.generation += 1
+
+    def shutdown(self):
+        self.cancel()
+        self.pool.waitForDone()
+
+    def _on_finished(self, generation, path, level, cells, tiles):
+        if generation != self.generation:
+            return
+        for row in range(cells.top(), cells.bottom() + 1):
+            for col in range(cells.left(), cells.right() + 1):
+                self.pending.discard((level, col, row))
+        if tiles is None:
+            return
+        for (col, row), image in tiles.items():
+            self.cache.put((path, level, col, row), image)
+        self.tiles_ready.emit()
+
+
+class SaveJob(QRunnable):
+    # Burns the rectangles into a taged_ copy, renames the original to xxx_ and
+    # renders the clipboard payload, all off the GUI thread. Without `save` only
+    # the clipboard payload is rendered.
+    def __init__(self, queue, job_id, image_path, image: QImage, rects, keep_quality=False, to_clipboard=True,
+                 save=True):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.queue = queue
+        self.job_id = job_id
+        self.image_path = image_path
+        self.image = image
+        self.rects = rects
+        self.keep_quality = keep_quality
+        self.to_clipboard = to_clipboard
+        self.save = save
+
+    def run(self):
+        try:
+            image = self.image
+            if image is None:
+                # Deferred (vectors-only) annotations and tiled images are rendered from disk.
+                with span("decode", path=self.image_path):
+                    image = QImage(self.image_path)
+                if image.isNull():
+                    raise OSError(f"cannot decode {self.image_path}")
+            base_dir, base_name = os.path.split(self.image_path)
+            taged, xxx = processed_names(base_name)
+
+            # Reuse the pixels already decoded for display instead of reading the
+            # JPEG again; PIL only sees the buffer for encoding.
+            annotated = render_annotated(image, self.rects)
+            if self.save:
+                with span("encode", path=taged):
+                    options = source_jpeg_options(self.image_path) if self.keep_quality else {}
+                    qimage_to_pil(annotated).save(os.path.join(base_dir, taged), "JPEG", **options)
+                with span("rename"):
+                    os.rename(self.image_path, os.path.join(base_dir, xxx))
+        except Exception as e:
+            self.queue.finished.emit(self.job_id, self.image_path, str(e), QImage())
+            return
+        # Deferred renders run in bulk; only interactive saves update the clipboard.
+        clip = annotated if self.to_clipboard else QImage()
+        self.queue.finished.emit(self.job_id, self.image_path, "", clip)
+
+
+class SaveQueue(QObject):
+    # Runs save (and clipboard-only) jobs one at a time, in submission order.
+    finished = pyqtSignal(int, str, str, QImage)
+    job_finished = pyqtSignal(str, str, QImage)
+    copy_finished = pyqtSignal(str, str, QImage)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.next_id = 0
+        self.jobs = {}
+        self.finished.connect(self._on_finished)
+
+    def submit(self, image_path, image: QImage, rects, keep_quality=False, to_clipboard=True, save=True):
+        self.next_id += 1
+        job = SaveJob(
+            self, self.next_id, image_path, image, [QRect(r) for r in rects], keep_quality, to_clipboard, save
+        )
+        self.jobs[self.next_id] = job
+        self.pool.start(job)
+
+    def copy(self, image_path, image: QImage, rects):
+        self.submit(image_path, image, rects, save=False)
+
+    def pending(self):
+        return sum(job.save for job in self.jobs.values())
+
+    def shutdown(self):
+        self.pool.waitForDone()
+
+    def _on_finished(self, job_id, image_path, error, clip):
+        job = self.jobs.pop(job_id, None)
+        if job is not None and not job.save:
+            self.copy_finished.emit(image_path, error, clip)
+            return
+        self.job_finished.emit(image_path, error, clip)
 
 
-class ImageLabel(QLabel):
+class ImageView(QWidget):
+    # Zoomable, pannable view of the current image. Mouse positions are handed to the
+    # annotator in image coordinates, so rectangles never depend on the zoom level.
+    MIN_SCALE = 1 / 256
+    MAX_SCALE = 16
+
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
         self.setMouseTracking(True)
+        self.pixmap = None
+        self.tiles = None
+        # Full-resolution size of the image; the pixmap may be a smaller stand-in.
+        self.source_size = QSize()
+        self.scale = 1.0
+        # Image point shown at the view's top-left corner.
+        self.offset = QPointF()
+        self.pan_start = None
+        # Follow the window size until the user zooms.
+        self.fitted = True
+        # Zoomed out, the pixmap is painted from a copy scaled to the zoom and device pixel ratio.
+        self.display = None
+        self.display_key = None
+        self.rescale_timer = QTimer(self)
+        self.rescale_timer.setSingleShot(True)
+        self.rescale_timer.setInterval(120)
+        self.rescale_timer.timeout.connect(self.rescale_display)
+
+    def image_size(self):
+        return self.source_size
+
+    def set_image(self, size: QSize, pixmap: QPixmap = None):
+        # A new image of `size` pixels. `pixmap` may be missing or a lower-resolution
+        # stand-in until set_pixmap() delivers something better.
+        self.source_size, self.pixmap, self.tiles = QSize(size), pixmap, None
+        self.display = None
+        self.display_key = None
+        self.fit()
+
+    def set_pixmap(self, pixmap: QPixmap):
+        # Same image at another resolution; the view stays put and the previous
+        # picture is stretched until the new one has been rescaled for display.
+        if self.pixmap is not None and (self.display is None or self.display_key != self.wanted_display_key()):
+            self.display = self.pixmap
+        self.pixmap = pixmap
+        self.display_key = None
+        self.update()
+
+    def set_tiles(self, tiles: TileLoader):
+        self.source_size, self.pixmap, self.tiles = QSize(tiles.size), None, tiles
+        self.display = None
+        self.display_key = None
+        self.fit()
+
+    def fit(self):
+        # Whole image in view and centred, never enlarged past 1:1.
+        size = self.image_size()
+        self.fitted = True
+        self.scale = 1.0
+        if not size.isEmpty() and self.width() > 0 and self.height() > 0:
+            self.scale = min(self.width() / size.width(), self.height() / size.height(), 1.0)
+        self.offset = QPointF()
+        self.clamp_offset()
+        self.update()
+
+    def to_image(self, pos):
+        return QPoint(
+            math.floor(self.offset.x() + pos.x() / self.scale),
+            math.floor(self.offset.y() + pos.y() / self.scale),
+        )
+
+    def to_view(self, rect: QRect):
+        # Smallest view rectangle covering an image rectangle.
+        s = self.scale
+        return QRectF(
+            (rect.x() - self.offset.x()) * s, (rect.y() - self.offset.y()) * s, rect.width() * s, rect.height() * s
+        ).toAlignedRect()
+
+    def zoom(self, factor, anchor=None):
+        # Zoom about `anchor` (view coordinates), keeping the image point under it in place.
+        anchor = QPointF(anchor) if anchor is not None else QPointF(self.width() / 2, self.height() / 2)
+        self.fitted = False
+        fixed = self.offset + anchor / self.scale
+        self.scale = min(max(self.scale * factor, self.MIN_SCALE), self.MAX_SCALE)
+        if abs(self.scale - 1) < 1e-6:
+            self.scale = 1.0
+        self.offset = fixed - anchor / self.scale
+        self.clamp_offset()
+        self.update()
+
+    def zoom_in(self):
+        self.zoom(1.25)
+
+    def zoom_out(self):
+        self.zoom(0.8)
+
+    def actual_size(self):
+        self.zoom(1 / self.scale)
+
+    def pan(self, dx, dy):
+        self.offset += QPointF(dx, dy) / self.scale
+        self.clamp_offset()
+        self.update()
+
+    def clamp_offset(self):
+        size = self.image_size()
+        x = self.clamp_axis(self.offset.x(), size.width(), self.width())
+        y = self.clamp_axis(self.offset.y(), size.height(), self.height())
+        self.offset = QPointF(x, y)
+
+    def clamp_axis(self, offset, extent, view):
+        # Offsets are kept on whole view pixels so the image, the overlay and the
+        # mouse mapping all agree exactly.
+        view /= self.scale
+        if extent <= view:
+            offset = -(view - extent) / 2
+        else:
+            offset = min(max(offset, 0), extent - view)
+        return round(offset * self.scale) / self.scale
+
+    def resizeEvent(self, event):
+        if self.fitted:
+            self.fit()
+        else:
+            self.clamp_offset()
+        super().resizeEvent(event)
+
+    def wheelEvent(self, event):
+        delta = event.angleDelta()
+        if event.modifiers() & Qt.ControlModifier:
+            self.zoom(1.25 ** (delta.y() / 120), event.pos())
+        elif event.modifiers() & Qt.ShiftModifier:
+            self.pan(-delta.y(), 0)
+        else:
+            self.pan(-delta.x(), -delta.y())
 
     def mousePressEvent(self, event):
-        self.parent.image_mouse_press(event)
+        if event.button() == Qt.MiddleButton:
+            self.pan_start = event.pos()
+        else:
+            self.parent.image_mouse_press(event)
 
     def mouseMoveEvent(self, event):
-        self.parent.image_mouse_move(event)
+        if self.pan_start is not None:
+            delta = self.pan_start - event.pos()
+            self.pan_start = event.pos()
+            self.pan(delta.x(), delta.y())
+        else:
+            self.parent.image_mouse_move(event)
 
     def mouseReleaseEvent(self, event):
-        self.parent.image_mouse_release(event)
+        if event.button() == Qt.MiddleButton:
+            self.pan_start = None
+        else:
+            self.parent.image_mouse_release(event)
+
+    def paintEvent(self, event):
+        # Rectangles are painted in image coordinates on top of the image, so edits
+        # never copy full-resolution pixels.
+        with span("paint"):
+            painter = QPainter(self)
+            if self.pixmap is not None:
+                self.paint_pixmap(painter)
+            elif self.tiles is None and not self.source_size.isEmpty():
+                # Nothing decoded yet; show where the image will be.
+                painter.fillRect(self.image_target(), QColor(220, 220, 220))
+            painter.scale(self.scale, self.scale)
+            painter.translate(-self.offset)
+            if self.tiles is not None:
+                self.paint_tiles(painter)
+            self.parent.paint_overlay(painter)
+            painter.end()
+
+    def image_target(self):
+        # Where the whole image lands in view coordinates.
+        return QRectF(
+            -self.offset.x() * self.scale, -self.offset.y() * self.scale,
+            self.source_size.width() * self.scale, self.source_size.height() * self.scale,
+        )
+
+    def paint_pixmap(self, painter: QPainter):
+        target = self.image_target()
+        pixmap = self.pixmap
+        if target.width() >= pixmap.width():
+            # At or above the pixmap's own resolution it is drawn directly.
+            if target.size() == QSizeF(pixmap.size()):
+                painter.drawPixmap(target.topLeft(), pixmap)
+                return
+            # Enlarging a stand-in is smoothed; the full image stays pixel-exact.
+            painter.setRenderHint(QPainter.SmoothPixmapTransform, pixmap.width() < self.source_size.width())
+            painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+            painter.setRenderHint(QPainter.SmoothPixmapTransform, False)
+            return
+        # Zoomed out, each frame only copies viewport-sized pixels from the display
+        # pixmap. While the zoom is changing the stale copy is stretched, and the
+        # smooth rescale waits until the zoom settles.
+        if self.display_key != self.wanted_display_key():
+            if self.display is None:
+                self.rescale_display()
+            else:
+                self.rescale_timer.start()
+                painter.drawPixmap(target, self.display, QRectF(self.display.rect()))
+                return
+        painter.drawPixmap(target.topLeft(), self.display)
+
+    def wanted_display_key(self):
+        return self.pixmap.cacheKey(), self.scale, self.devicePixelRatioF()
+
+    def rescale_display(self):
+        target = self.image_target()
+        if self.pixmap is None or target.width() >= self.pixmap.width():
+            return
+        dpr = self.devicePixelRatioF()
+        size = QSize(max(1, round(target.width() * dpr)), max(1, round(target.height() * dpr)))
+        self.display = self.pixmap.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        self.display.setDevicePixelRatio(dpr)
+        self.display_key = self.wanted_display_key()
+        self.update()
+
+    def paint_tiles(self, painter: QPainter):
+        tiles = self.tiles
+        level = tiles.level_for(self.scale)
+        visible = QRectF(self.offset, QSizeF(self.width() / self.scale, self.height() / self.scale))
+        missing = []
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        for col, row in tiles.cover(level, visible):
+            tile = tiles.tile(level, col, row)
+            target = tiles.tile_rect(level, col, row)
+            if tile is None:
+                missing.append((level, col, row))
+                self.paint_placeholder(painter, level, col, row, target)
+            elif not tile.isNull():
+                painter.drawImage(target, tile)
+        if level < tiles.backdrop and tiles.tile(tiles.backdrop, 0, 0) is None:
+            missing.append((tiles.backdrop, 0, 0))
+        if missing:
+            tiles.request(missing)
+
+    def paint_placeholder(self, painter: QPainter, level, col, row, target: QRectF):
+        # Until a tile arrives, stretch the matching part of the nearest coarser tile.
+        for up in range(level + 1, self.tiles.levels):
+            shift = up - level
+            coarse = self.tiles.tile(up, col >> shift, row >> shift)
+            if coarse is None or coarse.isNull():
+                continue
+            origin = self.tiles.tile_rect(up, col >> shift, row >> shift).topLeft()
+            f = 1 << up
+            source = QRectF(
+                (target.x() - origin.x()) / f, (target.y() - origin.y()) / f, target.width() / f, target.height() / f
+            )
+            painter.drawImage(target, coarse, source)
+            return
 
 
 class Annotator(QWidget):
@@ -35,20 +905,49 @@ class Annotator(QWidget):
         self.setWindowTitle("Image Annotator")
         self.default_rect_height = 150
 
-        # Image label
-        self.image_label = ImageLabel(self)
-        self.image_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
-        self.image_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        # Image view; very large images are shown from a tile pyramid instead of one pixmap
+        self.tile_loader = TileLoader(self)
+        self.image_view = ImageView(self)
+        self.image_view.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.image_view.setMinimumSize(400, 300)
+        self.tile_loader.tiles_ready.connect(self.image_view.update)
 
-        # Image lists (left)
-        self.image_list = QListWidget()
+        # Image lists (left); thumbnails are filled in asynchronously over a placeholder icon
+        self.thumbnail_loader = ThumbnailLoader(open_default_cache(), self)
+        self.image_model = FileListModel(self.thumbnail_loader, self)
+        self.taged_model = FileListModel(parent=self)
+        self.xxx_model = FileListModel(parent=self)
+
+        self.image_list = self.make_list_view(self.image_model)
         self.image_list.setMinimumWidth(250)
-        self.image_list.itemClicked.connect(self.load_selected_image)
+        self.image_list.clicked.connect(self.load_selected_image)
+
+        self.taged_list = self.make_list_view(self.taged_model)
+        self.xxx_list = self.make_list_view(self.xxx_model)
+        self.taged_list.clicked.connect(self.load_processed_image)
+        self.xxx_list.clicked.connect(self.load_processed_image)
+
+        # Decoded images, shared by the viewer and the prefetcher and bounded by bytes
+        self.image_cache = LRUCache(IMAGE_CACHE_BUDGET, image_bytes)
+        self.prefetcher = ImagePrefetcher(self.image_cache, self)
+        self.prefetcher.preview_ready.connect(self.on_preview_ready)
+        self.prefetcher.image_ready.connect(self.on_image_ready)
 
-        self.taged_list = QListWidget()
-        self.xxx_list = QListWidget()
-        self.taged_list.itemClicked.connect(self.load_processed_image)
-        self.xxx_list.itemClicked.connect(self.load_processed_image)
+        # Saves are encoded and renamed in the background, one at a time
+        self.save_queue = SaveQueue(self)
+        self.save_queue.job_finished.connect(self.on_save_finished)
+        self.save_queue.copy_finished.connect(self.on_copy_finished)
+        self.pending_saves = set()
+        self.save_errors: List[str] = []
+
+        # External changes to the folder are folded into the model after a short debounce
+        self.folder_model = None
+        self.folder_watcher = QFileSystemWatcher(self)
+        self.folder_watcher.directoryChanged.connect(self.schedule_folder_sync)
+        self.folder_sync_timer = QTimer(self)
+        self.folder_sync_timer.setSingleShot(True)
+        self.folder_sync_timer.setInterval(300)
+        self.folder_sync_timer.timeout.connect(self.sync_folder)
 
         self.sort_selector = QComboBox()
         self.sort_selector.addItems(["Sort by name", "Sort by date"])
@@ -86,20 +985,42 @@ class Annotator(QWidget):
         self.copy_button = QPushButton("📋 Copy to Clipboard (Ctrl+C)")
         self.copy_button.clicked.connect(self.copy_to_clipboard)
 
+        self.render_button = QPushButton("🖨 Render Pending Vectors")
+        self.render_button.clicked.connect(self.render_pending_vectors)
+
         self.height_input = QSpinBox()
         self.height_input.setRange(10, 1000)
         self.height_input.setValue(self.default_rect_height)
         self.height_input.setSuffix(" px")
 
+        self.prefetch_input = QSpinBox()
+        self.prefetch_input.setRange(0, 10)
+        self.prefetch_input.setValue(3)
+        self.prefetch_input.setSuffix(" images")
+
+        self.save_mode_selector = QComboBox()
+        self.save_mode_selector.addItems(["Burn in (taged_/xxx_)", "Vectors only (sidecar)"])
+
+        self.jpeg_selector = QComboBox()
+        self.jpeg_selector.addItems(["Standard (q75)", "Keep source quality"])
+
         form = QFormLayout()
         form.addRow("📏 Rectangle Height:", self.height_input)
+        form.addRow("🔮 Prefetch Ahead:", self.prefetch_input)
+        form.addRow("💾 Save Mode:", self.save_mode_selector)
+        form.addRow("🗜 JPEG Output:", self.jpeg_selector)
+
+        self.save_status = QLabel()
+        self.save_status.setWordWrap(True)
 
         controls_layout = QVBoxLayout()
         controls_layout.addWidget(self.open_folder_button)
         controls_layout.addWidget(self.new_button)
         controls_layout.addWidget(self.save_button)
         controls_layout.addWidget(self.copy_button)
+        controls_layout.addWidget(self.render_button)
         controls_layout.addLayout(form)
+        controls_layout.addWidget(self.save_status)
         controls_layout.addStretch()
 
         controls_widget = QWidget()
@@ -107,7 +1028,7 @@ class Annotator(QWidget):
         controls_widget.setFixedWidth(220)
 
         right_split = QHBoxLayout()
-        right_split.addWidget(self.image_label, 3)
+        right_split.addWidget(self.image_view, 3)
         right_split.addWidget(controls_widget)
 
         right_container = QWidget()
@@ -123,17 +1044,53 @@ class Annotator(QWidget):
         QShortcut(QKeySequence("Ctrl+A"), self).activated.connect(self.add_new_rectangle)
         QShortcut(QKeySequence("Ctrl+S"), self).activated.connect(self.save_annotated_image)
         QShortcut(QKeySequence("Ctrl+C"), self).activated.connect(self.copy_to_clipboard)
+        QShortcut(QKeySequence.ZoomIn, self).activated.connect(self.image_view.zoom_in)
+        QShortcut(QKeySequence.ZoomOut, self).activated.connect(self.image_view.zoom_out)
+        QShortcut(QKeySequence("Ctrl+0"), self).activated.connect(self.image_view.fit)
+        QShortcut(QKeySequence("Ctrl+1"), self).activated.connect(self.image_view.actual_size)
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self).activated.connect(self.toggle_profiling)
+        QShortcut(QKeySequence.Refresh, self).activated.connect(self.reload_folder)
 
         # State
         self.folder_path = None
         self.image_path = None
         self.original_pixmap = None
+        # (path, size, mtime_ns) of the file original_pixmap was decoded from.
+        self.pixmap_key = None
+        self.image_size = QSize()
         self.rects: List[QRect] = []
         self.selected_index = -1
         self.dragging = False
         self.drag_offset = QPoint()
         self.resizing = False
         self.resize_corner = None
+        self.pending_move = None
+        self.move_timer = QTimer(self)
+        self.move_timer.setSingleShot(True)
+        self.move_timer.timeout.connect(self.flush_mouse_move)
+
+        if PROFILE_MODE in ("spans", "cprofile"):
+            profiling.start(profile=PROFILE_MODE == "cprofile")
+
+        # The heartbeat only fires while the event loop is free; the watchdog
+        # thread notices when it goes quiet.
+        self.watchdog = None
+        if STALL_THRESHOLD_MS > 0:
+            self.watchdog = StallWatchdog(STALL_THRESHOLD_MS, self.log_stall)
+            self.heartbeat = QTimer(self)
+            self.heartbeat.setInterval(max(10, min(50, STALL_THRESHOLD_MS // 4)))
+            self.heartbeat.timeout.connect(self.watchdog.beat)
+            self.heartbeat.start()
+            self.watchdog.start()
+
+    def make_list_view(self, model):
+        view = QListView()
+        # Uniform sizes + batched layout keep huge folders from being measured row by row up front.
+        view.setUniformItemSizes(True)
+        view.setLayoutMode(QListView.Batched)
+        view.setBatchSize(2000)
+        view.setModel(model)
+        return view
 
     def select_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Folder", "")
@@ -145,58 +1102,124 @@ class Annotator(QWidget):
         if not self.folder_path:
             return
 
-        self.image_list.clear()
-        self.taged_list.clear()
-        self.xxx_list.clear()
+        with span("list.refresh"):
+            self.thumbnail_loader.cancel()
+            self.prefetcher.cancel()
+            self.folder_model = FolderModel(
+                self.folder_path, self.sort_selector.currentText() == "Sort by date", load_records(self.folder_path)
+            )
+            self.folder_model.scan()
+            if self.folder_watcher.directories():
+                self.folder_watcher.removePaths(self.folder_watcher.directories())
+            self.folder_watcher.addPath(self.folder_path)
 
-        files = [f for f in os.listdir(self.folder_path) if f.lower().endswith(".jpg")]
-        sort_by = self.sort_selector.currentText()
-        key_func = (
-            (lambda f: os.path.getmtime(os.path.join(self.folder_path, f)))
-            if sort_by == "Sort by date"
-            else (lambda f: f.lower())
-        )
+            self.image_model.set_names(
+                self.folder_path, self.folder_model.names["to_annotate"], self.folder_model.entries,
+                self.folder_model.row,
+            )
+            self.taged_model.set_names(self.folder_path, self.folder_model.names["taged"])
+            self.xxx_model.set_names(self.folder_path, self.folder_model.names["xxx"])
 
-        to_annotate = sorted([f for f in files if not f.startswith("taged_") and not f.startswith("xxx_")], key=key_func, reverse=sort_by == "Sort by date")
-        taged = sorted([f for f in files if f.startswith("taged_")], key=key_func, reverse=sort_by == "Sort by date")
-        xxx = sorted([f for f in files if f.startswith("xxx_")], key=key_func, reverse=sort_by == "Sort by date")
-
-        for f in to_annotate:
-            path = os.path.join(self.folder_path, f)
-            icon = QIcon(QPixmap(path).scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-            self.image_list.addItem(QListWidgetItem(icon, f))
-
-        for f in taged:
-            self.taged_list.addItem(f)
-        for f in xxx:
-            self.xxx_list.addItem(f)
-
-        if to_annotate:
-            self.image_list.setCurrentRow(0)
-            self.load_selected_image(self.image_list.item(0))
-
-    def load_selected_image(self, item: QListWidgetItem):
-        self.image_path = os.path.join(self.folder_path, item.text())
-        self.original_pixmap = QPixmap(self.image_path)
-        self.image_label.setPixmap(self.original_pixmap)
-        self.image_label.setFixedSize(self.original_pixmap.size())
-        self.rects.clear()
-        self.selected_index = -1
-        self.update_display()
+            if self.image_model.rowCount() > 0:
+                self.image_list.setCurrentIndex(self.image_model.index(0))
+                self.load_selected_image(self.image_model.index(0))
 
-    def load_processed_image(self, item: QListWidgetItem):
-        self.image_path = os.path.join(self.folder_path, item.text())
-        self.original_pixmap = QPixmap(self.image_path)
-        self.image_label.setPixmap(self.original_pixmap)
-        self.image_label.setFixedSize(self.original_pixmap.size())
-        self.rects.clear()
-        self.selected_index = -1
-        self.update_display()
+    def apply_folder_changes(self, changes):
+        models = {"to_annotate": self.image_model, "taged": self.taged_model, "xxx": self.xxx_model}
+        for action, category, row, name in changes:
+            if action == "remove":
+                models[category].remove_row(row)
+                forget_image(self.image_cache, os.path.join(self.folder_path, name))
+            else:
+                models[category].insert_name(row, name)
+
+    def schedule_folder_sync(self, path):
+        self.folder_sync_timer.start()
+
+    def sync_folder(self, full=False):
+        if not self.folder_model:
+            return
+        with span("list.sync"):
+            if not os.path.isdir(self.folder_path):
+                return
+            self.apply_folder_changes(self.folder_model.sync(ignore=self.pending_saves, full=full))
+
+    def reload_folder(self):
+        # Watcher syncs only see files added or removed; this also catches files rewritten in place.
+        self.sync_folder(full=True)
+
+    def cached_thumbnail(self, path):
+        cache = self.thumbnail_loader.cache
+        entry = self.folder_model.entries.get(os.path.basename(path)) if self.folder_model else None
+        if cache is None or entry is None:
+            return None
+        data = cache.get(path, entry.size, entry.mtime_ns)
+        image = QImage.fromData(data) if data is not None else QImage()
+        return QPixmap.fromImage(image) if not image.isNull() else None
+
+    def prefetch_around(self, row):
+        # The row being opened comes first, so its full decode is never stuck behind a neighbour's.
+        count = self.image_model.rowCount()
+        rows = [row] + list(range(row + 1, row + 1 + self.prefetch_input.value())) + [row - 1]
+        self.prefetcher.prefetch([
+            os.path.join(self.folder_path, self.image_model.names[r]) for r in rows if 0 <= r < count
+        ])
+
+    def open_image(self, path):
+        with span("open", path=path):
+            self.image_path = path
+            self.original_pixmap = None
+            self.pixmap_key = None
+            self.rects.clear()
+            self.selected_index = -1
+            self.end_drag()
+            size = QImageReader(path).size()
+            self.image_size = size if size.isValid() else QSize()
+            if size.width() * size.height() > TILED_MIN_PIXELS:
+                self.tile_loader.open(path, size)
+                self.image_view.set_tiles(self.tile_loader)
+                return
+            self.tile_loader.cancel()
+            key = image_key(path)
+            image = self.image_cache.get(key) if key is not None else None
+            if image is not None:
+                self.original_pixmap = QPixmap.fromImage(image)
+                self.pixmap_key = key
+                self.image_view.set_image(self.original_pixmap.size(), self.original_pixmap)
+                return
+            # Not decoded yet. The header gives the size, so rectangles can be placed
+            # straight away over the cached thumbnail; a reduced decode sized to the
+            # view, then the full image, replace it as they finish.
+            self.image_view.set_image(self.image_size, self.cached_thumbnail(path))
+            dpr = self.image_view.devicePixelRatioF()
+            box = QSize(math.ceil(self.image_view.width() * dpr), math.ceil(self.image_view.height() * dpr))
+            if size.width() > 2 * box.width() or size.height() > 2 * box.height():
+                # Below a 2x reduction the DCT can't skip enough work to beat the full decode.
+                self.prefetcher.preview(path, box)
+
+    def on_preview_ready(self, path, image: QImage):
+        if path == self.image_path and self.original_pixmap is None and self.image_view.tiles is None:
+            self.image_view.set_pixmap(QPixmap.fromImage(image))
+
+    def on_image_ready(self, key, image: QImage):
+        if key[0] == self.image_path and self.original_pixmap is None and self.image_view.tiles is None:
+            self.original_pixmap = QPixmap.fromImage(image)
+            self.pixmap_key = key
+            self.image_view.set_pixmap(self.original_pixmap)
+
+    def load_selected_image(self, index: QModelIndex):
+        self.open_image(os.path.join(self.folder_path, index.data()))
+        self.prefetch_around(index.row())
+
+    def load_processed_image(self, index: QModelIndex):
+        path = os.path.join(self.folder_path, index.data())
+        self.open_image(path)
+        self.prefetcher.prefetch([path])
 
     def add_new_rectangle(self):
-        if not self.original_pixmap:
+        if self.image_size.isEmpty():
             return
-        img_w, img_h = self.original_pixmap.width(), self.original_pixmap.height()
+        img_w, img_h = self.image_size.width(), self.image_size.height()
         w = int(img_w * 0.9)
         h = min(self.height_input.value(), img_h - 20)
         x = (img_w - w) // 2
@@ -205,14 +1228,16 @@ class Annotator(QWidget):
         self.selected_index = len(self.rects) - 1
         self.update_display()
 
+    def handle_size(self):
+        # Handles keep the same size on screen at any zoom; in image pixels they scale with 1/zoom.
+        return max(1, round(self.HANDLE_SIZE / self.image_view.scale))
+
+    def border_thickness(self):
+        # Zoomed out, the real border would shrink below a screen pixel; draw it at least that wide.
+        return max(BORDER_THICKNESS, math.ceil(1 / self.image_view.scale))
+
     def get_corner_handles(self, rect: QRect):
-        hs = self.HANDLE_SIZE
-        return {
-            'tl': QRect(rect.topLeft() - QPoint(hs, hs), QSize(hs * 2, hs * 2)),
-            'tr': QRect(rect.topRight() - QPoint(hs, hs), QSize(hs * 2, hs * 2)),
-            'bl': QRect(rect.bottomLeft() - QPoint(hs, hs), QSize(hs * 2, hs * 2)),
-            'br': QRect(rect.bottomRight() - QPoint(hs, hs), QSize(hs * 2, hs * 2)),
-        }
+        return corner_handles(rect, self.handle_size())
 
     def get_resize_corner(self, pos, rect):
         for name, handle in self.get_corner_handles(rect).items():
@@ -221,7 +1246,7 @@ class Annotator(QWidget):
         return None
 
     def image_mouse_press(self, event):
-        pos = event.pos()
+        pos = self.image_view.to_image(event.pos())
         self.selected_index = -1
         for i, r in enumerate(reversed(self.rects)):
             idx = len(self.rects) - 1 - i
@@ -230,17 +1255,53 @@ class Annotator(QWidget):
                 self.selected_index = idx
                 self.resizing = True
                 self.resize_corner = corner
-                return
+                break
             elif r.contains(pos):
                 self.selected_index = idx
                 self.dragging = True
                 self.drag_offset = pos - r.topLeft()
-                return
+                break
         self.update_display()
 
+    def rect_damage(self, rect: QRect):
+        # The border grows outwards from the edge and the corner handles stick out past it;
+        # the interior of the rectangle is untouched, so leave it out.
+        m = max(self.handle_size(), self.border_thickness()) + 1
+        outer = QRegion(self.image_view.to_view(rect.adjusted(-m, -m, m, m)).adjusted(-1, -1, 1, 1))
+        inner = self.image_view.to_view(rect.adjusted(m, m, -m, -m)).adjusted(1, 1, -1, -1)
+        return outer.subtracted(QRegion(inner)) if inner.isValid() else outer
+
+    def frame_interval_ms(self):
+        handle = self.windowHandle()
+        screen = handle.screen() if handle else QApplication.primaryScreen()
+        rate = screen.refreshRate() if screen else 0
+        return max(1, int(1000 / (rate or 60)))
+
     def image_mouse_move(self, event):
-        pos = event.pos()
-        if self.resizing and self.selected_index >= 0:
+        if self.selected_index < 0 or not (self.resizing or self.dragging):
+            return
+        # Apply the first move at once, then at most one per display frame using
+        # the latest position, so fast mice can't queue up more work than we can show.
+        pos = self.image_view.to_image(event.pos())
+        if self.move_timer.isActive():
+            self.pending_move = pos
+            return
+        self.apply_mouse_move(pos)
+        self.move_timer.start(self.frame_interval_ms())
+
+    def flush_mouse_move(self):
+        if self.pending_move is None:
+            return
+        pos, self.pending_move = self.pending_move, None
+        self.apply_mouse_move(pos)
+        self.move_timer.start(self.frame_interval_ms())
+
+    def apply_mouse_move(self, pos):
+        # A save or image switch mid-drag leaves nothing to move.
+        if not 0 <= self.selected_index < len(self.rects):
+            return
+        old = QRect(self.rects[self.selected_index])
+        if self.resizing:
             r = self.rects[self.selected_index]
             start, end = r.topLeft(), r.bottomRight()
             if self.resize_corner == 'tl': start = pos
@@ -248,83 +1309,203 @@ class Annotator(QWidget):
             elif self.resize_corner == 'bl': start.setX(pos.x()); end.setY(pos.y())
             elif self.resize_corner == 'br': end = pos
             self.rects[self.selected_index] = QRect(start, end).normalized()
-        elif self.dragging and self.selected_index >= 0:
+        else:
             new_pos = pos - self.drag_offset
             self.rects[self.selected_index].moveTopLeft(new_pos)
-        self.update_display()
+        # Only the area covered by the rectangle before and after the move needs repainting.
+        self.update_display(self.rect_damage(old) | self.rect_damage(self.rects[self.selected_index]))
 
     def image_mouse_release(self, event):
+        self.move_timer.stop()
+        if self.pending_move is not None:
+            pos, self.pending_move = self.pending_move, None
+            self.apply_mouse_move(pos)
+        self.end_drag()
+
+    def end_drag(self):
+        self.move_timer.stop()
+        self.pending_move = None
         self.dragging = False
         self.resizing = False
         self.resize_corner = None
 
-    def update_display(self):
-        if not self.original_pixmap: return
-        pixmap = QPixmap(self.original_pixmap)
-        painter = QPainter(pixmap)
-        pen = QPen(QColor(255, 0, 0), 3)
-        painter.setPen(pen)
+    def paint_overlay(self, painter: QPainter):
+        if self.image_size.isEmpty():
+            return
+        # Same border geometry as render_annotated, so the view matches the saved file.
+        red = QColor(255, 0, 0)
+        thickness = self.border_thickness()
         for i, r in enumerate(self.rects):
-            painter.drawRect(r)
+            for band in border_bands(r.left(), r.top(), r.width(), r.height(), thickness):
+                painter.fillRect(QRect(*band), red)
             if i == self.selected_index:
                 for h in self.get_corner_handles(r).values():
-                    painter.fillRect(h, QColor(255, 0, 0))
-        painter.end()
-        self.image_label.setPixmap(pixmap)
+                    painter.fillRect(h, red)
+
+    def update_display(self, region: QRegion = None):
+        if region is None:
+            self.image_view.update()
+        else:
+            self.image_view.update(region)
 
     def save_annotated_image(self):
-        if not self.image_path:
+        if not self.image_path or self.image_size.isEmpty():
             return
-        base_dir = os.path.dirname(self.image_path)
-        base_name = os.path.basename(self.image_path)
-        name, ext = os.path.splitext(base_name)
-        save_path = os.path.join(base_dir, f"taged_{name}.jpg")
-
-        img = Image.open(self.image_path).convert("RGB")
-        draw = ImageDraw.Draw(img)
-        for r in self.rects:
-            x, y, w, h = r.left(), r.top(), r.width(), r.height()
-            for i in range(3):
-                draw.rectangle([x-i, y-i, x+w+i, y+h+i], outline="red")
-        img.save(save_path, "JPEG")
-        os.rename(self.image_path, os.path.join(base_dir, f"xxx_{name}{ext}"))
-        self.copy_to_clipboard()
-        self.image_path = None
-        self.original_pixmap = None
-        self.rects.clear()
-        self.selected_index = -1
-        self.refresh_file_lists()
-        if self.image_list.count() > 0:
-            self.image_list.setCurrentRow(0)
-            self.load_selected_image(self.image_list.item(0))
+        with span("save"):
+            base_name = os.path.basename(self.image_path)
+            if self.save_mode_selector.currentIndex() == 1:
+                # Vectors only: record the rectangles and move on; rendering happens later in bulk.
+                rects = [(r.left(), r.top(), r.width(), r.height()) for r in self.rects]
+                append_annotation(self.folder_path, base_name, rects)
+                forget_image(self.image_cache, self.image_path)
+                self.apply_folder_changes(self.folder_model.defer(base_name))
+            else:
+                # Only pixels decoded from the file as it is now may be burned into its taged_ copy.
+                key = image_key(self.image_path)
+                image = self.image_cache.pop(key) if key is not None else None
+                if image is None and self.original_pixmap and self.pixmap_key == key:
+                    image = self.original_pixmap.toImage()
+                # Tiled images (and files changed since they were decoded) are read from disk by the job.
+                keep_quality = self.jpeg_selector.currentIndex() == 1
+                self.save_queue.submit(self.image_path, image, self.rects, keep_quality)
+                # The file leaves the to-annotate list now; its taged_/xxx_ entries
+                # appear once the background job has written them.
+                self.pending_saves.add(base_name)
+                self.apply_folder_changes(self.folder_model.remove(base_name))
+            self.update_save_status()
+
+            self.image_path = None
+            self.original_pixmap = None
+            self.pixmap_key = None
+            self.image_size = QSize()
+            self.tile_loader.cancel()
+            self.rects.clear()
+            self.selected_index = -1
+            self.end_drag()
+            if self.image_model.rowCount() > 0:
+                self.image_list.setCurrentIndex(self.image_model.index(0))
+                self.load_selected_image(self.image_model.index(0))
+            else:
+                pixmap = QPixmap(400, 200)
+                pixmap.fill(Qt.white)
+                p = QPainter(pixmap)
+                p.setPen(QColor(0, 150, 0))
+                p.setFont(self.font())
+                p.drawText(pixmap.rect(), Qt.AlignCenter, "🎉 All images done!")
+                p.end()
+                self.image_view.set_image(pixmap.size(), pixmap)
+
+    def on_save_finished(self, image_path, error, clip: QImage):
+        base_name = os.path.basename(image_path)
+        self.pending_saves.discard(base_name)
+        if error:
+            print(f"❌ Failed to save {base_name}: {error}")
+            self.save_errors.append(f"{base_name}: {error}")
+            if self.folder_model and os.path.dirname(image_path) == self.folder_path:
+                # A source the job never got to rename goes back on the list (unless it is
+                # a deferred render, which stays hidden); anything else it left behind on
+                # disk is picked up by the sync.
+                if base_name not in self.folder_model.deferred and os.path.exists(image_path):
+                    self.apply_folder_changes(self.folder_model.insert(base_name))
+                self.apply_folder_changes(self.folder_model.sync(ignore=self.pending_saves))
         else:
-            pixmap = QPixmap(400, 200)
-            pixmap.fill(Qt.white)
-            p = QPainter(pixmap)
-            p.setPen(QColor(0, 150, 0))
-            p.setFont(self.font())
-            p.drawText(pixmap.rect(), Qt.AlignCenter, "🎉 All images done!")
-            p.end()
-            self.image_label.setPixmap(pixmap)
+            print(f"💾 Saved {base_name}")
+            if self.folder_model and os.path.dirname(image_path) == self.folder_path:
+                self.apply_folder_changes(self.folder_model.apply_save(base_name))
+            if not clip.isNull():
+                with span("clipboard"):
+                    QApplication.clipboard().setImage(clip)
+                print("📋 Copied image to clipboard!")
+        self.update_save_status()
+
+    def render_pending_vectors(self):
+        if not self.folder_path:
+            return
+        keep_quality = self.jpeg_selector.currentIndex() == 1
+        for name, rects in pending_annotations(self.folder_path).items():
+            if name in self.pending_saves:
+                continue
+            self.pending_saves.add(name)
+            self.save_queue.submit(
+                os.path.join(self.folder_path, name), None, [QRect(*r) for r in rects], keep_quality, False
+            )
+        self.update_save_status()
+
+    def update_save_status(self):
+        lines = []
+        pending = self.save_queue.pending()
+        if pending:
+            lines.append(f"⏳ Saving {pending} image{'s' if pending != 1 else ''}…")
+        if self.save_errors:
+            lines.append(f"❌ {len(self.save_errors)} failed save(s), last: {self.save_errors[-1]}")
+        self.save_status.setText("\n".join(lines))
 
     def copy_to_clipboard(self):
-        if not self.original_pixmap:
+        if not self.image_path or self.image_size.isEmpty():
             return
-        pixmap = QPixmap(self.original_pixmap)
-        painter = QPainter(pixmap)
-        pen = QPen(QColor(255, 0, 0), 3)
-        painter.setPen(pen)
-        for i, r in enumerate(self.rects):
-            painter.drawRect(r)
-            if i == self.selected_index:
-                for h in self.get_corner_handles(r).values():
-                    painter.fillRect(h, QColor(255, 0, 0))
-        painter.end()
-        QApplication.clipboard().setPixmap(pixmap)
+        key = image_key(self.image_path)
+        image = self.image_cache.get(key) if key is not None else None
+        if image is None and self.original_pixmap and self.pixmap_key == key:
+            image = self.original_pixmap.toImage()
+        if image is None:
+            # Tiled images (and ones not decoded yet) are read and rendered by the save worker.
+            self.save_queue.copy(self.image_path, None, self.rects)
+            return
+        annotated = render_annotated(image, self.rects)
+        with span("clipboard"):
+            QApplication.clipboard().setImage(annotated)
         print("📋 Copied image to clipboard!")
 
+    def on_copy_finished(self, image_path, error, clip: QImage):
+        if error:
+            print(f"❌ Failed to copy {os.path.basename(image_path)}: {error}")
+            return
+        with span("clipboard"):
+            QApplication.clipboard().setImage(clip)
+        print("📋 Copied image to clipboard!")
+
+    def toggle_profiling(self):
+        if profiling.is_enabled():
+            self.finish_profiling()
+        else:
+            profiling.start(profile=PROFILE_MODE == "cprofile")
+            print("⏺ Profiling started; Ctrl+Shift+P again to save the trace")
+
+    def finish_profiling(self):
+        profiling.stop()
+        profiling.print_summary()
+        paths = profiling.save(TRACE_DIR)
+        print(f"⏹ Trace saved to {', '.join(paths)}")
+
+    def log_stall(self, message):
+        # Called on the watchdog thread: print and append to the stall log, nothing Qt.
+        print(message)
+        try:
+            with open(STALL_LOG, "a", encoding="utf-8") as f:
+                f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {message}\n")
+        except OSError:
+            pass
+
+    def closeEvent(self, event):
+        # Waiting for the pools below would only be reported as a stall.
+        if self.watchdog:
+            self.watchdog.stop()
+        self.thumbnail_loader.shutdown()
+        self.prefetcher.shutdown()
+        self.tile_loader.shutdown()
+        self.save_queue.shutdown()
+        for label, cache in (("Image", self.image_cache), ("Tile", self.tile_loader.cache)):
+            st = cache.stats()
+            print(f"🗃 {label} cache: {st['hits']} hits, {st['misses']} misses, {st['evictions']} evictions, "
+                  f"{st['items']} items in {st['bytes'] / 2**20:.0f}/{st['budget_bytes'] / 2**20:.0f} MB")
+        if profiling.is_enabled():
+            self.finish_profiling()
+        super().closeEvent(event)
+
 
 if __name__ == "__main__":
+    QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
+    QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps)
     app = QApplication(sys.argv)
     window = Annotator()
     window.resize(1200, 800)
@@ -0,0 +1,70 @@
+import importlib.util
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from synth_corpus import generate
+
+
+def load_annotator():
+    # annotator-final.py isn't importable by name, so load it from its path.
+    spec = importlib.util.spec_from_file_location("annotator_final", os.path.join(ROOT, "annotator-final.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_corpus(folder, count, megapixels, quality=90, **options):
+    # See synth_corpus.generate for the options (annotated mix, size range, seed...).
+    return generate(folder, count, megapixels, quality=quality, **options)
+
+
+def peak_rss_mb():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def pump(app, until=None, timeout=30.0):
+    # Run the event loop until `until()` holds (or just once without one).
+    deadline = time.perf_counter() + timeout
+    while True:
+        app.processEvents()
+        if until is None or until() or time.perf_counter() > deadline:
+            return
+        time.sleep(0.001)
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    if len(samples) > 1:
+        pct = statistics.quantiles(samples, n=100, method="inclusive")
+        p50, p90, p99 = pct[49], pct[89], pct[98]
+    else:
+        p50 = p90 = p99 = samples[0]
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(p50, 3),
+        "p90_ms": round(p90, 3),
+        "p99_ms": round(p99, 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def new_window(module, app, work, thumbs, prefetch):
+    from thumbcache import ThumbnailCache
+    window = module.Annotator()
+    # A private thumbnail cache keeps runs cold and leaves the user's cache alone.
+    window.thumbnail_loader.cache = ThumbnailCache(thumbs)
+    window.prefetch_input.setValue(prefetch)
+    window.resize(1200, 800)
+    window.show()
+    pump(app)
+    window.folder_path = work
+    return window
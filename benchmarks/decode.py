@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import load_annotator, make_corpus, peak_rss_mb
+
+MODES = ["prepare", "baseline", "qt-full", "qt-scaled", "pil-full", "pil-draft"]
+
+
+def run_mode(mode, paths, target):
+    # Every mode, the baseline included, imports the same modules first, so the
+    # peak RSS above the baseline is the decoding alone and not Qt's or PIL's footprint.
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QImage
+    from PIL import Image
+    read_scaled_image = load_annotator().read_scaled_image
+    if mode == "baseline":
+        return 0.0
+
+    start = time.perf_counter()
+    for path in paths:
+        if mode == "qt-full":
+            QImage(path).scaled(target, target, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        elif mode == "qt-scaled":
+            read_scaled_image(path, target, target)
+        elif mode == "pil-full":
+            with Image.open(path) as img:
+                img.load()
+                img.thumbnail((target, target))
+        elif mode == "pil-draft":
+            with Image.open(path) as img:
+                img.draft("RGB", (target, target))
+                img.thumbnail((target, target))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full and reduced-resolution JPEG decoding.")
+    parser.add_argument("--folder", default=os.path.join(tempfile.gettempdir(), "imager-bench-decode"))
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--megapixels", type=float, default=24)
+    parser.add_argument("--target", type=int, default=64, help="longest side of the decoded result")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # One corpus per size and count, so runs with different parameters never share files.
+        corpus = os.path.join(args.folder, f"{args.count}x{args.megapixels:g}mp")
+        paths = make_corpus(corpus, args.count, args.megapixels)
+        seconds = run_mode(args.child, paths, args.target) if args.child != "prepare" else 0.0
+        print(json.dumps({"seconds": seconds, "peak_rss_mb": peak_rss_mb()}))
+        return
+
+    # Each mode (including corpus generation) runs in a fresh process: peak RSS
+    # survives exec on Linux, so the parent has to stay small too.
+    results = {}
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--folder", args.folder, "--count", str(args.count),
+             "--megapixels", str(args.megapixels), "--target", str(args.target)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[mode] = json.loads(out.strip().splitlines()[-1])
+
+    results.pop("prepare")
+    base_rss = results.pop("baseline")["peak_rss_mb"]
+    print(f"{args.count} images, {args.megapixels} MP, target {args.target}px")
+    print(f"{'mode':<10} {'ms/image':>10} {'peak MB':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['seconds'] * 1000 / args.count:>10.1f} {r['peak_rss_mb'] - base_rss:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QEvent, QPoint, QRect, Qt
+from PyQt5.QtGui import QMouseEvent
+from PyQt5.QtWidgets import QApplication
+
+from common import load_annotator, make_corpus
+
+
+def mouse_event(kind, pos):
+    return QMouseEvent(kind, pos, Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+
+
+def drag_frame_times(app, window, moves, full_repaint):
+    if full_repaint:
+        window.update_display = lambda region=None: window.image_view.update()
+    else:
+        window.__dict__.pop("update_display", None)
+    window.rects.clear()
+    window.add_new_rectangle()
+    app.processEvents()
+    start = window.rects[0].center()
+    press = window.image_view.to_view(QRect(start, start)).topLeft()
+    window.image_mouse_press(mouse_event(QEvent.MouseButtonPress, press))
+    app.processEvents()
+    times = []
+    for i in range(moves):
+        offset = QPoint(i % 50, i % 37)
+        t0 = time.perf_counter()
+        # Moves are coalesced per display frame; time the per-frame update itself.
+        window.apply_mouse_move(start + offset)
+        app.processEvents()
+        times.append((time.perf_counter() - t0) * 1000)
+    window.image_mouse_release(mouse_event(QEvent.MouseButtonRelease, press))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-move frame time while dragging a rectangle.")
+    parser.add_argument("--folder", default=os.path.join(tempfile.gettempdir(), "imager-bench-drag"))
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[6, 24, 50])
+    parser.add_argument("--moves", type=int, default=200)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    Annotator = load_annotator().Annotator
+    print(f"{'MP':>6} {'mode':<8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for mp in args.megapixels:
+        folder = os.path.join(args.folder, f"{mp:g}mp")
+        make_corpus(folder, 1, mp)
+        window = Annotator()
+        window.resize(1200, 800)
+        window.show()
+        window.folder_path = folder
+        window.refresh_file_lists()
+        # Images open progressively; measure against the full-resolution one.
+        while window.original_pixmap is None:
+            app.processEvents()
+            time.sleep(0.005)
+        for mode in ("full", "dirty"):
+            times = drag_frame_times(app, window, args.moves, mode == "full")
+            p95 = statistics.quantiles(times, n=20)[-1]
+            print(f"{mp:>6g} {mode:<8} {statistics.mean(times):>9.2f} {statistics.median(times):>9.2f} {p95:>9.2f}")
+        window.close()
+
+
+if __name__ == "__main__":
+    main()
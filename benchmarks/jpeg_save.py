@@ -0,0 +1,64 @@
+import argparse
+import io
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from common import make_corpus
+from render import border_bands, burn_rects, source_jpeg_options
+
+
+def psnr(a, b, mask):
+    diff = (a.astype(np.int16) - b.astype(np.int16))[mask]
+    mse = float(np.mean(diff.astype(np.float64) ** 2))
+    return float("inf") if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare standard and source-table JPEG re-encoding on save.")
+    parser.add_argument("--folder", default=os.path.join(tempfile.gettempdir(), "imager-bench-jpeg"))
+    parser.add_argument("--count", type=int, default=5)
+    parser.add_argument("--megapixels", type=float, default=24)
+    parser.add_argument("--quality", type=int, default=92, help="quality of the synthetic source JPEGs")
+    parser.add_argument("--rects", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = os.path.join(args.folder, f"{args.count}x{args.megapixels:g}mp-q{args.quality}")
+    paths = make_corpus(corpus, args.count, args.megapixels, args.quality)
+    rng = random.Random(0)
+    totals = {"standard": [0.0, 0, 0.0], "keep-tables": [0.0, 0, 0.0]}
+    for path in paths:
+        with Image.open(path) as src:
+            pixels = np.asarray(src.convert("RGB")).copy()
+        h, w = pixels.shape[:2]
+        rects = [(rng.randrange(w // 2), rng.randrange(h // 2), w // 3, 150) for _ in range(args.rects)]
+        burn_rects(pixels, rects)
+        untouched = np.ones((h, w), bool)
+        for rect in rects:
+            for x, y, bw, bh in border_bands(*rect):
+                untouched[max(y, 0):y + bh, max(x, 0):x + bw] = False
+        image = Image.fromarray(pixels)
+        for mode, options in (("standard", {}), ("keep-tables", source_jpeg_options(path))):
+            buffer = io.BytesIO()
+            t0 = time.perf_counter()
+            image.save(buffer, "JPEG", **options)
+            elapsed = time.perf_counter() - t0
+            decoded = np.asarray(Image.open(io.BytesIO(buffer.getvalue())).convert("RGB"))
+            totals[mode][0] += elapsed
+            totals[mode][1] += buffer.tell()
+            totals[mode][2] += psnr(decoded, pixels, untouched)
+
+    n = len(paths)
+    print(f"{n} images, {args.megapixels} MP, source quality {args.quality}, {args.rects} rects each")
+    print(f"{'mode':<12} {'ms/image':>10} {'KB/image':>10} {'PSNR dB':>9}")
+    for mode, (seconds, size, quality) in totals.items():
+        print(f"{mode:<12} {seconds * 1000 / n:>10.1f} {size / 1024 / n:>10.0f} {quality / n:>9.2f}")
+    print("PSNR is measured against the annotated pixels outside the burned-in borders.")
+
+
+if __name__ == "__main__":
+    main()
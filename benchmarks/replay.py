@@ -0,0 +1,309 @@
+import argparse
+import gzip
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from common import load_annotator, new_window, pump, summarize
+
+# A recording is JSON lines: a header object, then one short array per event.
+#   ["s", t, w, h]                       image view resized
+#   ["o", t, name]                       image opened
+#   ["p"|"m"|"r", t, x, y, button, buttons, modifiers]
+#   ["w", t, x, y, dx, dy, buttons, modifiers]
+#   ["k", t, "Ctrl+S"]                   shortcut fired
+# t is in milliseconds since recording started; positions are in image view pixels.
+VERSION = 1
+KIND_NAMES = {"s": "resize", "o": "open", "p": "press", "m": "move", "r": "release", "w": "wheel"}
+
+
+def open_recording(path, mode):
+    opener = gzip.open if path.endswith(".gz") else open
+    return opener(path, mode + "t", encoding="utf-8")
+
+
+def save_recording(path, header, events):
+    with open_recording(path, "w") as f:
+        f.write(json.dumps(header) + "\n")
+        for event in events:
+            f.write(json.dumps(event, separators=(",", ":")) + "\n")
+
+
+def load_recording(path):
+    with open_recording(path, "r") as f:
+        header = json.loads(f.readline())
+        if header.get("version") != VERSION:
+            raise ValueError(f"{path}: unsupported recording version {header.get('version')}")
+        return header, [json.loads(line) for line in f if line.strip()]
+
+
+def event_name(event):
+    return f"key {event[2]}" if event[0] == "k" else KIND_NAMES[event[0]]
+
+
+def make_recorder(window):
+    from PyQt5.QtCore import QEvent, QObject
+
+    mouse_kinds = {QEvent.MouseButtonPress: "p", QEvent.MouseMove: "m", QEvent.MouseButtonRelease: "r"}
+
+    class Recorder(QObject):
+        # Installed on the application, so it sees shortcuts as well as the view's
+        # own mouse events. It only watches; every event goes on to its target.
+        def __init__(self):
+            super().__init__(window)
+            self.start = time.perf_counter()
+            self.events = []
+            self.image = None
+
+        def now(self):
+            return round((time.perf_counter() - self.start) * 1000, 1)
+
+        def add(self, kind, *args):
+            t = self.now()
+            name = os.path.basename(window.image_path) if window.image_path else None
+            if name != self.image:
+                self.image = name
+                if name:
+                    self.events.append(["o", t, name])
+            self.events.append([kind, t, *args])
+
+        def eventFilter(self, obj, event):
+            kind = event.type()
+            view = window.image_view
+            if obj is view and kind in mouse_kinds:
+                p = event.pos()
+                self.add(mouse_kinds[kind], p.x(), p.y(), int(event.button()), int(event.buttons()), int(event.modifiers()))
+            elif obj is view and kind == QEvent.Wheel:
+                p, d = event.pos(), event.angleDelta()
+                self.add("w", p.x(), p.y(), d.x(), d.y(), int(event.buttons()), int(event.modifiers()))
+            elif obj is view and kind == QEvent.Resize:
+                self.events.append(["s", self.now(), event.size().width(), event.size().height()])
+            elif kind == QEvent.Shortcut and obj.parent() is window:
+                self.add("k", event.key().toString())
+            return False
+
+    return Recorder()
+
+
+def record(args):
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtWidgets import QApplication
+
+    QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
+    QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps)
+    app = QApplication(sys.argv[:1])
+    module = load_annotator()
+    window = module.Annotator()
+    recorder = make_recorder(window)
+    app.installEventFilter(recorder)
+    window.resize(1200, 800)
+    window.show()
+    if args.folder:
+        window.folder_path = os.path.abspath(args.folder)
+        window.refresh_file_lists()
+    print(f"🔴 Recording to {args.recording}; close the window to stop")
+    code = app.exec_()
+    header = {
+        "version": VERSION,
+        "frame_ms": window.frame_interval_ms(),
+        "dpr": window.image_view.devicePixelRatioF(),
+        "recorded": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    save_recording(args.recording, header, recorder.events)
+    print(f"💾 Saved {len(recorder.events)} events to {args.recording}")
+    return code
+
+
+def open_by_name(window, name):
+    if window.image_path and os.path.basename(window.image_path) == name:
+        return True
+    for model, load in (
+        (window.image_model, window.load_selected_image),
+        (window.taged_model, window.load_processed_image),
+        (window.xxx_model, window.load_processed_image),
+    ):
+        if name in model.names:
+            load(model.index(model.names.index(name)))
+            return True
+    return False
+
+
+def resize_view(app, window, width, height):
+    # The view gets a share of any change to the window, so close in on the size.
+    for _ in range(4):
+        size = window.image_view.size()
+        if (size.width(), size.height()) == (width, height):
+            return
+        window.resize(window.width() + width - size.width(), window.height() + height - size.height())
+        pump(app)
+
+
+def make_dispatcher(app, window):
+    from PyQt5.QtCore import QEvent, QPoint, QPointF, Qt
+    from PyQt5.QtGui import QMouseEvent, QWheelEvent
+    from PyQt5.QtWidgets import QShortcut
+
+    mouse_types = {"p": QEvent.MouseButtonPress, "m": QEvent.MouseMove, "r": QEvent.MouseButtonRelease}
+    shortcuts = {s.key().toString(): s for s in window.findChildren(QShortcut)}
+    missing = []
+
+    def dispatch(event):
+        kind, view = event[0], window.image_view
+        if kind in mouse_types:
+            x, y, button, buttons, modifiers = event[2:]
+            app.sendEvent(view, QMouseEvent(
+                mouse_types[kind], QPointF(x, y), Qt.MouseButton(button), Qt.MouseButtons(buttons),
+                Qt.KeyboardModifiers(modifiers),
+            ))
+        elif kind == "w":
+            x, y, dx, dy, buttons, modifiers = event[2:]
+            pos = QPointF(x, y)
+            app.sendEvent(view, QWheelEvent(
+                pos, QPointF(view.mapToGlobal(pos.toPoint())), QPoint(), QPoint(dx, dy),
+                Qt.MouseButtons(buttons), Qt.KeyboardModifiers(modifiers), Qt.NoScrollPhase, False,
+            ))
+        elif kind == "k":
+            shortcut = shortcuts.get(event[2])
+            if shortcut is not None:
+                shortcut.activated.emit()
+        elif kind == "o":
+            if not open_by_name(window, event[2]):
+                missing.append(event[2])
+        elif kind == "s":
+            resize_view(app, window, event[2], event[3])
+
+    return dispatch, missing
+
+
+def replay(args):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    header, events = load_recording(args.recording)
+    app = QApplication.instance() or QApplication([])
+    module = load_annotator()
+    scratch = tempfile.mkdtemp(prefix="imager-replay-")
+    try:
+        # Saves rename files, so replay against a copy of the folder.
+        work = os.path.join(scratch, "work")
+        shutil.copytree(args.folder, work)
+        window = new_window(module, app, work, os.path.join(scratch, "thumbs.sqlite3"), args.prefetch)
+        window.refresh_file_lists()
+        pump(app)
+        results = run_replay(app, window, header, events, args)
+        pump(app, lambda: window.save_queue.pending() == 0, timeout=600)
+        results["save_errors"] = list(window.save_errors)
+        window.close()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return report(results, args)
+
+
+def run_replay(app, window, header, events, args):
+    # Each event is dispatched straight to its target and the event loop is then
+    # drained, so `frame` covers the handler plus the repaint it asked for. Any
+    # stretch of GUI-thread work longer than a frame drops ceil(ms / frame) - 1
+    # frames, whether it follows an event or happens while waiting for the next.
+    frame_ms = args.frame_ms or header.get("frame_ms") or 16
+    dispatch, missing = make_dispatcher(app, window)
+    handle = defaultdict(list)
+    frame = defaultdict(list)
+    dropped = idle_dropped = 0
+    max_lag_ms = 0.0
+    start = time.perf_counter()
+    for event in events:
+        if not args.max_speed:
+            due = start + event[1] / 1000
+            while True:
+                t0 = time.perf_counter()
+                if t0 >= due:
+                    break
+                app.processEvents()
+                busy = (time.perf_counter() - t0) * 1000
+                idle_dropped += max(0, math.ceil(busy / frame_ms) - 1)
+                time.sleep(min(0.001, max(0.0, due - time.perf_counter())))
+            max_lag_ms = max(max_lag_ms, (time.perf_counter() - due) * 1000)
+        t0 = time.perf_counter()
+        dispatch(event)
+        t1 = time.perf_counter()
+        app.processEvents()
+        t2 = time.perf_counter()
+        name = event_name(event)
+        handle[name].append((t1 - t0) * 1000)
+        frame[name].append((t2 - t0) * 1000)
+        dropped += max(0, math.ceil((t2 - t0) * 1000 / frame_ms) - 1)
+    return {
+        "recording": args.recording,
+        "speed": "max" if args.max_speed else "original",
+        "frame_ms": frame_ms,
+        "events": len(events),
+        "seconds": round(time.perf_counter() - start, 3),
+        "recorded_seconds": round(events[-1][1] / 1000, 3) if events else 0,
+        "handle": {name: summarize(samples) for name, samples in handle.items()},
+        "frame": {name: summarize(samples) for name, samples in frame.items()},
+        "dropped_frames": dropped,
+        "idle_dropped_frames": idle_dropped,
+        "max_lag_ms": round(max_lag_ms, 3),
+        "missing_images": missing,
+    }
+
+
+def report(results, args):
+    print(f"{results['events']} events replayed at {results['speed']} speed in {results['seconds']:.1f} s "
+          f"(recorded {results['recorded_seconds']:.1f} s), frame budget {results['frame_ms']} ms")
+    print(f"{'event':<14} {'n':>5} {'handle p50':>11} {'handle p99':>11} {'frame p50':>10} {'frame p99':>10} {'frame max':>10}")
+    for name, h in results["handle"].items():
+        f = results["frame"][name]
+        print(f"{name:<14} {h['count']:>5} {h['p50_ms']:>11.2f} {h['p99_ms']:>11.2f} "
+              f"{f['p50_ms']:>10.2f} {f['p99_ms']:>10.2f} {f['max_ms']:>10.2f}")
+    print(f"dropped frames: {results['dropped_frames']} on events, {results['idle_dropped_frames']} between them")
+    if not args.max_speed:
+        print(f"worst lag behind the recording: {results['max_lag_ms']:.1f} ms")
+    if results["missing_images"]:
+        print(f"⚠️ {len(results['missing_images'])} recorded images not found in the folder")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    # Gates for CI: compare against the budgets given on the command line.
+    failures = []
+    if args.max_dropped is not None and results["dropped_frames"] > args.max_dropped:
+        failures.append(f"{results['dropped_frames']} dropped frames > {args.max_dropped}")
+    if args.max_frame_ms is not None:
+        for name in ("press", "move", "release"):
+            f = results["frame"].get(name)
+            if f and f["p99_ms"] > args.max_frame_ms:
+                failures.append(f"{name} p99 frame {f['p99_ms']:.2f} ms > {args.max_frame_ms} ms")
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record an annotation session, or replay one headlessly and time it.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="run the annotator and record mouse and shortcut events")
+    rec.add_argument("recording", help="file to write (.gz to compress)")
+    rec.add_argument("--folder", help="open this folder straight away")
+
+    rep = sub.add_parser("replay", help="drive a headless annotator with a recording")
+    rep.add_argument("recording")
+    rep.add_argument("--folder", required=True, help="folder holding the recorded images; a copy is used")
+    rep.add_argument("--max-speed", action="store_true", help="dispatch events back to back instead of on their timestamps")
+    rep.add_argument("--frame-ms", type=float, help="frame budget (default: the recording's display)")
+    rep.add_argument("--prefetch", type=int, default=3)
+    rep.add_argument("--json", metavar="PATH", help="also write the results here")
+    rep.add_argument("--max-dropped", type=int, help="fail if more frames than this are dropped on events")
+    rep.add_argument("--max-frame-ms", type=float, help="fail if press/move/release p99 frame time exceeds this")
+    args = parser.parse_args()
+    return record(args) if args.command == "record" else replay(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
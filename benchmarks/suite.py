@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from common import load_annotator, make_corpus, new_window, peak_rss_mb, pump, summarize
+
+
+class Timings:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def call(self, name, fn, *args):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        self.samples[name].append((time.perf_counter() - t0) * 1000)
+        return result
+
+    def add(self, name, ms):
+        self.samples[name].append(ms)
+
+
+def fresh_copy(corpus, work):
+    shutil.rmtree(work, ignore_errors=True)
+    shutil.copytree(corpus, work)
+
+
+def measure_operations(module, app, timings, work, thumbs, args):
+    window = new_window(module, app, work, thumbs, args.prefetch)
+    for _ in range(args.refreshes):
+        timings.call("refresh_file_lists", window.refresh_file_lists)
+        pump(app)
+
+    for row in range(window.image_model.rowCount()):
+        t0 = time.perf_counter()
+        timings.call("load_selected_image", window.load_selected_image, window.image_model.index(row))
+        pump(app, lambda: window.original_pixmap is not None)
+        timings.add("load_until_full_resolution", (time.perf_counter() - t0) * 1000)
+        window.add_new_rectangle()
+        for _ in range(args.repaints):
+            t0 = time.perf_counter()
+            window.update_display()
+            pump(app)
+            timings.add("update_display", (time.perf_counter() - t0) * 1000)
+        timings.call("copy_to_clipboard", window.copy_to_clipboard)
+    cache = window.image_cache.stats()
+    window.close()
+    return cache
+
+
+def annotate_save_loop(module, app, timings, work, thumbs, args):
+    # A scripted operator: add a rectangle, drag it a little, save, repeat until
+    # the folder is done. Nothing waits for decodes that the operator wouldn't.
+    from PyQt5.QtCore import QEvent, QPoint, QRect, Qt
+    from PyQt5.QtGui import QMouseEvent
+
+    def mouse(kind, pos):
+        return QMouseEvent(kind, pos, Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+
+    window = new_window(module, app, work, thumbs, args.prefetch)
+    submitted = {}
+    window.save_queue.job_finished.connect(
+        lambda path, error, clip: timings.add("save_until_written", (time.perf_counter() - submitted[path]) * 1000)
+    )
+    start = time.perf_counter()
+    window.refresh_file_lists()
+    images = 0
+    while window.image_path:
+        window.add_new_rectangle()
+        view = window.image_view
+        center = window.rects[-1].center()
+        press = view.to_view(QRect(center, center)).topLeft()
+        window.image_mouse_press(mouse(QEvent.MouseButtonPress, press))
+        for step in range(1, 11):
+            window.image_mouse_move(mouse(QEvent.MouseMove, press + QPoint(step * 2, step)))
+            pump(app)
+        window.image_mouse_release(mouse(QEvent.MouseButtonRelease, press + QPoint(20, 10)))
+        submitted[window.image_path] = time.perf_counter()
+        timings.call("save_annotated_image", window.save_annotated_image)
+        pump(app)
+        images += 1
+    pump(app, lambda: window.save_queue.pending() == 0, timeout=600)
+    elapsed = time.perf_counter() - start
+    errors = list(window.save_errors)
+    window.close()
+    return images, elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the annotator's hot paths headlessly on a synthetic corpus.")
+    parser.add_argument("--folder", default=os.path.join(tempfile.gettempdir(), "imager-bench-suite"))
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--done", type=float, default=0.3, help="fraction of the corpus already annotated")
+    parser.add_argument("--prefetch", type=int, default=3)
+    parser.add_argument("--refreshes", type=int, default=10)
+    parser.add_argument("--repaints", type=int, default=5, help="full repaints timed per image")
+    parser.add_argument("--json", metavar="PATH", help="also write the results here")
+    parser.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    corpus = os.path.join(args.folder, f"corpus-{args.count}x{args.megapixels:g}mp-{args.done:g}done")
+    if args.prepare:
+        make_corpus(corpus, args.count, args.megapixels, done=args.done)
+        return
+    # Generating the corpus is memory-hungry; do it in a child so peak RSS is ours alone.
+    subprocess.run(
+        [sys.executable, __file__, "--prepare", "--folder", args.folder,
+         "--count", str(args.count), "--megapixels", str(args.megapixels), "--done", str(args.done)],
+        check=True,
+    )
+
+    from PyQt5.QtCore import PYQT_VERSION_STR, QT_VERSION_STR
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    module = load_annotator()
+    baseline_rss = peak_rss_mb()
+
+    timings = Timings()
+    work = os.path.join(args.folder, "work")
+    scratch = tempfile.mkdtemp(prefix="imager-suite-")
+    try:
+        fresh_copy(corpus, work)
+        image_cache = measure_operations(module, app, timings, work, os.path.join(scratch, "ops.sqlite3"), args)
+        fresh_copy(corpus, work)
+        images, elapsed, errors = annotate_save_loop(
+            module, app, timings, work, os.path.join(scratch, "loop.sqlite3"), args
+        )
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    results = {
+        "config": {"count": args.count, "megapixels": args.megapixels, "done": args.done, "prefetch": args.prefetch},
+        "environment": {
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": platform.platform(),
+            "qpa": os.environ.get("QT_QPA_PLATFORM"),
+        },
+        "operations": {name: summarize(samples) for name, samples in timings.samples.items()},
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "image_cache": image_cache,
+        "loop": {
+            "images": images,
+            "seconds": round(elapsed, 3),
+            "images_per_hour": round(images / elapsed * 3600) if elapsed else 0,
+            "save_errors": errors,
+        },
+    }
+
+    print(f"{args.count} images, {args.megapixels:g} MP")
+    print(f"{'operation':<28} {'n':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, s in results["operations"].items():
+        print(f"{name:<28} {s['count']:>5} {s['p50_ms']:>9.2f} {s['p90_ms']:>9.2f} {s['p99_ms']:>9.2f} {s['max_ms']:>9.2f}")
+    print(f"peak RSS {results['peak_rss_mb']:.1f} MB (baseline {results['baseline_rss_mb']:.1f} MB)")
+    print(f"image cache: {image_cache['hits']} hits, {image_cache['misses']} misses, "
+          f"{image_cache['evictions']} evictions")
+    print(f"annotate-save loop: {images} images in {elapsed:.1f} s, {results['loop']['images_per_hour']} images/hour")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from folder_model import TAGED_PREFIX, processed_names
+
+# 2024-01-01 00:00 UTC; mtimes are spread back from here so runs are reproducible.
+EPOCH = 1704067200
+NOISE_TILE = 1024
+# What each file in the folder was generated from, so changed arguments regenerate it.
+MANIFEST_NAME = ".synth-corpus.json"
+
+
+class Spec(NamedTuple):
+    name: str
+    width: int
+    height: int
+    seed: int
+    mtime: int
+    # Set for a taged_ file: the xxx_ original it is a copy of (same size and seed).
+    copy_of: str = ""
+
+
+def synthetic_image(width, height, seed=0):
+    # Noise carries the JPEG's entropy (and so its size and decode cost), the
+    # gradient keeps it from being pure static. A seeded tile of noise repeated
+    # over the frame costs a fraction of full-frame noise and compresses the same.
+    import numpy as np
+    from PIL import Image
+    noise = np.random.default_rng(seed).normal(128, 40 + seed % 20, (NOISE_TILE, NOISE_TILE))
+    block = Image.fromarray(noise.clip(0, 255).astype(np.uint8))
+    flipped = block.transpose(Image.FLIP_LEFT_RIGHT)
+    red = Image.new("L", (width, height))
+    blue = Image.new("L", (width, height))
+    for y in range(0, height, NOISE_TILE):
+        for x in range(0, width, NOISE_TILE):
+            red.paste(block, (x, y))
+            blue.paste(flipped, (x, y))
+    gradient = Image.linear_gradient("L").resize((width, height))
+    return Image.merge("RGB", (red, gradient, blue))
+
+
+def frame_size(megapixels, portrait=False):
+    width = int((megapixels * 1e6 * 3 / 2) ** 0.5)
+    height = int(width * 2 / 3)
+    return (height, width) if portrait else (width, height)
+
+
+def plan(count, megapixels=12, done=0.0, portrait=0.0, days=30, seed=0, stem="synthetic"):
+    # The same arguments always give the same names, sizes, pixels and mtimes.
+    # `megapixels` is a number or a (low, high) range. A `done` fraction of the
+    # images look already annotated: an xxx_ original plus its taged_ copy, the
+    # copy stamped a little after the original as a real save would be.
+    rng = random.Random(seed)
+    low, high = megapixels if isinstance(megapixels, (tuple, list)) else (megapixels, megapixels)
+    specs = []
+    for i in range(count):
+        name = f"{stem}_{i:05d}.jpg"
+        width, height = frame_size(rng.uniform(low, high), rng.random() < portrait)
+        mtime = EPOCH - rng.randrange(max(1, days * 86400))
+        if rng.random() < done:
+            taged, xxx = processed_names(name)
+            specs.append(Spec(xxx, width, height, seed * 1_000_003 + i, mtime))
+            specs.append(Spec(taged, width, height, seed * 1_000_003 + i, mtime + rng.randrange(5, 600), copy_of=xxx))
+        else:
+            specs.append(Spec(name, width, height, seed * 1_000_003 + i, mtime))
+    return specs
+
+
+def spec_key(spec: Spec, quality):
+    # Everything the file's bytes depend on; the mtime is reset on every run anyway.
+    return [spec.width, spec.height, spec.seed, quality, spec.copy_of]
+
+
+def load_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(folder, manifest):
+    path = os.path.join(folder, MANIFEST_NAME)
+    with open(path + ".part", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(path + ".part", path)
+
+
+def write_image(folder, spec: Spec, quality=90):
+    path = os.path.join(folder, spec.name)
+    # Write under a temporary name so an interrupted run never leaves a torn JPEG behind.
+    tmp = path + ".part"
+    if spec.copy_of:
+        shutil.copyfile(os.path.join(folder, spec.copy_of), tmp)
+    else:
+        synthetic_image(spec.width, spec.height, spec.seed).save(tmp, "JPEG", quality=quality)
+    os.replace(tmp, path)
+    return path
+
+
+def _write_batch(folder, specs, quality):
+    return [write_image(folder, spec, quality) for spec in specs]
+
+
+def generate(folder, count, megapixels=12, done=0.0, portrait=0.0, days=30, seed=0,
+             quality=90, workers=None, stem="synthetic"):
+    # Writes the corpus with one process per core. Files the manifest says were
+    # made from the same parameters are kept (only their mtimes are reset), so a
+    # second call with the same arguments is cheap; anything else is regenerated,
+    # and files left over from a different plan are removed.
+    os.makedirs(folder, exist_ok=True)
+    specs = plan(count, megapixels, done, portrait, days, seed, stem)
+    manifest = load_manifest(folder)
+    wanted = {s.name for s in specs}
+    for name in [n for n in manifest if n not in wanted]:
+        try:
+            os.remove(os.path.join(folder, name))
+        except FileNotFoundError:
+            pass
+        del manifest[name]
+    todo = [
+        s for s in specs
+        if manifest.get(s.name) != spec_key(s, quality) or not os.path.exists(os.path.join(folder, s.name))
+    ]
+    # Forget what is about to be rewritten first, so an interrupted run can't leave
+    # new pixels recorded under the old parameters.
+    for s in todo:
+        manifest.pop(s.name, None)
+    save_manifest(folder, manifest)
+
+    # taged_ copies need their original on disk first, so they go in a second pass.
+    originals = [s for s in todo if not s.copy_of]
+    copies = [s for s in todo if s.copy_of]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(originals)))
+    if workers == 1:
+        _write_batch(folder, originals, quality)
+    else:
+        batches = [originals[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(workers) as pool:
+            list(pool.map(_write_batch, [folder] * workers, batches, [quality] * workers))
+    _write_batch(folder, copies, quality)
+
+    for s in specs:
+        os.utime(os.path.join(folder, s.name), (s.mtime, s.mtime))
+        manifest[s.name] = spec_key(s, quality)
+    save_manifest(folder, manifest)
+    return [os.path.join(folder, s.name) for s in specs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a reproducible folder of synthetic JPEGs for stress tests.")
+    parser.add_argument("folder")
+    parser.add_argument("--count", type=int, default=1000, help="source images; annotated ones add a taged_ copy")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[12, 50], metavar="MP",
+                        help="a size, or a low and high bound to draw sizes from")
+    parser.add_argument("--done", type=float, default=0.3, help="fraction already annotated (xxx_ + taged_)")
+    parser.add_argument("--portrait", type=float, default=0.2, help="fraction in portrait orientation")
+    parser.add_argument("--days", type=int, default=30, help="spread of the mtimes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quality", type=int, default=90)
+    parser.add_argument("--workers", type=int, help="processes to use (default: one per core)")
+    args = parser.parse_args()
+
+    megapixels = args.megapixels[0] if len(args.megapixels) == 1 else tuple(args.megapixels[:2])
+    t0 = time.perf_counter()
+    paths = generate(args.folder, args.count, megapixels, args.done, args.portrait, args.days,
+                     args.seed, args.quality, args.workers)
+    elapsed = time.perf_counter() - t0
+    taged = sum(os.path.basename(p).startswith(TAGED_PREFIX) for p in paths)
+    size = sum(os.path.getsize(p) for p in paths)
+    print(f"✅ {len(paths)} files ({taged} annotated) in {args.folder}: {size / 1e9:.2f} GB in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
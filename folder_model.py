@@ -0,0 +1,182 @@
+import os
+from bisect import bisect_right
+from typing import Dict, NamedTuple
+
+from sidecar import record_matches
+
+TAGED_PREFIX = "taged_"
+XXX_PREFIX = "xxx_"
+CATEGORIES = ("to_annotate", "taged", "xxx")
+
+
+def is_image(name):
+    return name.lower().endswith(".jpg")
+
+
+def category_of(name):
+    if name.startswith(TAGED_PREFIX):
+        return "taged"
+    if name.startswith(XXX_PREFIX):
+        return "xxx"
+    return "to_annotate"
+
+
+class FileEntry(NamedTuple):
+    name: str
+    size: int
+    mtime_ns: int
+
+
+def stat_entry(folder, name):
+    st = os.stat(os.path.join(folder, name))
+    return FileEntry(name, st.st_size, st.st_mtime_ns)
+
+
+def scan_folder(folder):
+    # One scandir pass collects name, size and mtime for every image. On network
+    # shares this replaces a stat per sort key with a single directory read. It is
+    # read afresh on every open: a file rewritten in place leaves the directory
+    # mtime alone, so a reused snapshot would serve its old size and mtime.
+    entries = {}
+    with os.scandir(folder) as it:
+        for e in it:
+            if is_image(e.name):
+                st = e.stat()
+                entries[e.name] = FileEntry(e.name, st.st_size, st.st_mtime_ns)
+    return entries
+
+
+def processed_names(name):
+    stem, ext = os.path.splitext(name)
+    return f"{TAGED_PREFIX}{stem}.jpg", f"{XXX_PREFIX}{stem}{ext}"
+
+
+class FolderModel:
+    # In-memory, sorted view of a folder's three file lists, fed from one
+    # scan_folder pass. Mutations return the list of changes ("remove"/"insert", category,
+    # row, name) so views can apply them directly instead of rebuilding.
+
+    def __init__(self, folder, sort_by_date=False, annotations=None):
+        self.folder = folder
+        self.sort_by_date = sort_by_date
+        # Sidecar records (name -> record) of files annotated as vectors only.
+        self.annotations = annotations or {}
+        # Files annotated as vectors only (name -> entry it was annotated at): done,
+        # but not rendered or renamed yet.
+        self.deferred: Dict[str, FileEntry] = {}
+        self.names = {c: [] for c in CATEGORIES}
+        self.keys = {c: [] for c in CATEGORIES}
+        self.entries: Dict[str, FileEntry] = {}
+
+    def sort_key(self, name):
+        if self.sort_by_date:
+            # Newest first, expressed as an ascending key so bisect works.
+            return -self.entries[name].mtime_ns
+        return name.lower()
+
+    def scan(self):
+        snapshot = scan_folder(self.folder)
+        # A record only hides the file it was made for; a new file that reuses a
+        # rendered name has a different size or mtime and is listed again.
+        for name, record in self.annotations.items():
+            entry = snapshot.get(name)
+            if entry is not None and record_matches(record, entry.size, entry.mtime_ns):
+                self.deferred[name] = entry
+        self.entries = {n: e for n, e in snapshot.items() if n not in self.deferred}
+        buckets = {c: [] for c in CATEGORIES}
+        for f in self.entries:
+            buckets[category_of(f)].append(f)
+        for c, files in buckets.items():
+            keys = [self.sort_key(f) for f in files]
+            order = sorted(range(len(files)), key=keys.__getitem__)
+            self.keys[c] = [keys[i] for i in order]
+            self.names[c] = [files[i] for i in order]
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def row(self, name):
+        if name not in self.entries:
+            return -1
+        c = category_of(name)
+        key = self.sort_key(name)
+        keys, names = self.keys[c], self.names[c]
+        i = bisect_right(keys, key) - 1
+        while i >= 0 and keys[i] == key:
+            if names[i] == name:
+                return i
+            i -= 1
+        return -1
+
+    def insert(self, name, entry=None):
+        if name in self.entries:
+            return []
+        self.entries[name] = entry or stat_entry(self.folder, name)
+        c = category_of(name)
+        key = self.sort_key(name)
+        i = bisect_right(self.keys[c], key)
+        self.keys[c].insert(i, key)
+        self.names[c].insert(i, name)
+        return [("insert", c, i, name)]
+
+    def remove(self, name):
+        i = self.row(name)
+        if i < 0:
+            return []
+        c = category_of(name)
+        del self.keys[c][i]
+        del self.names[c][i]
+        del self.entries[name]
+        return [("remove", c, i, name)]
+
+    def apply_save(self, name):
+        taged, xxx = processed_names(name)
+        # A rendered deferred file is gone; a new file taking its name is listed as usual.
+        self.deferred.pop(name, None)
+        return self.remove(name) + self.insert(taged) + self.insert(xxx)
+
+    def defer(self, name):
+        self.deferred[name] = stat_entry(self.folder, name)
+        return self.remove(name)
+
+    def sync(self, ignore=(), full=False):
+        # Bring the model in line with what is on disk now. Names in `ignore`
+        # (e.g. files with a save in flight) are left untouched, and so are the
+        # taged_/xxx_ files those saves are writing. The directory mtime can't tell
+        # our own saves from changes made alongside them, so the listing is always read.
+        ignore = set(ignore)
+        for name in list(ignore):
+            ignore.update(processed_names(name))
+        if full:
+            # Stats every file, so files rewritten in place are picked up too.
+            fresh = scan_folder(self.folder)
+        else:
+            # A directory read finds added and removed names; only new names are stat'ed.
+            fresh = dict.fromkeys(n for n in os.listdir(self.folder) if is_image(n))
+        # A deferred file stays hidden only while it is still the file that was annotated.
+        for name, entry in list(self.deferred.items()):
+            if name in ignore:
+                continue
+            if name in fresh and fresh[name] is None:
+                try:
+                    fresh[name] = stat_entry(self.folder, name)
+                except FileNotFoundError:
+                    del fresh[name]
+            if fresh.get(name) != entry:
+                del self.deferred[name]
+        ignore.update(self.deferred)
+        if full:
+            stale = [n for n, e in self.entries.items() if n not in ignore and fresh.get(n) != e]
+        else:
+            stale = [n for n in self.entries if n not in ignore and n not in fresh]
+        changes = []
+        for name in sorted(stale):
+            changes += self.remove(name)
+        for name in sorted(fresh):
+            if name not in ignore and name not in self.entries:
+                try:
+                    changes += self.insert(name, fresh[name])
+                except FileNotFoundError:
+                    # Gone again between the listing and the stat.
+                    continue
+        return changes
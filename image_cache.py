@@ -0,0 +1,63 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    # Least-recently-used cache bounded by the total cost of its values rather
+    # than their count. `cost` maps a value to its size in bytes.
+
+    def __init__(self, budget_bytes, cost):
+        self.budget_bytes = budget_bytes
+        self.cost = cost
+        self.items = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key):
+        item = self.items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value):
+        nbytes = self.cost(value)
+        self.pop(key)
+        if nbytes > self.budget_bytes:
+            return
+        self.items[key] = (value, nbytes)
+        self.total_bytes += nbytes
+        while self.total_bytes > self.budget_bytes:
+            _, (_, evicted) = self.items.popitem(last=False)
+            self.total_bytes -= evicted
+            self.evictions += 1
+
+    def pop(self, key):
+        item = self.items.pop(key, None)
+        if item is None:
+            return None
+        self.total_bytes -= item[1]
+        return item[0]
+
+    def clear(self):
+        self.items.clear()
+        self.total_bytes = 0
+
+    def stats(self):
+        return {
+            "items": len(self.items),
+            "bytes": self.total_bytes,
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
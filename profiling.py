@@ -0,0 +1,149 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+# Spans are only recorded between start() and stop(). While off, span() hands back
+# a shared do-nothing context manager and @traced functions call straight through,
+# so the hooks can stay in hot paths.
+_enabled = False
+_events = []
+_threads = {}
+_origin_ns = 0
+_profiler = None
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _record(name, start_ns, end_ns, args):
+    tid = threading.get_ident()
+    if tid not in _threads:
+        _threads[tid] = threading.current_thread().name
+    # list.append is atomic, so worker threads can record without a lock.
+    _events.append((name, tid, start_ns, end_ns, args))
+
+
+def span(name, **args):
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name=None):
+    # For plain functions. Qt slots should use `with span(...)` in their body:
+    # PyQt trims signal arguments by retrying on TypeError, which a wrapper confuses.
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(label, start, time.perf_counter_ns(), None)
+        return wrapper
+    return decorate
+
+
+def is_enabled():
+    return _enabled
+
+
+def start(profile=False):
+    # `profile` also runs cProfile, which only sees the thread that called start().
+    global _enabled, _origin_ns, _profiler
+    _events.clear()
+    _origin_ns = time.perf_counter_ns()
+    _profiler = cProfile.Profile() if profile else None
+    if _profiler is not None:
+        _profiler.enable()
+    _enabled = True
+
+
+def stop():
+    global _enabled
+    _enabled = False
+    if _profiler is not None:
+        _profiler.disable()
+
+
+def trace_events():
+    # Chrome trace format; open with chrome://tracing or ui.perfetto.dev.
+    pid = os.getpid()
+    events = [
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+        for tid, name in _threads.items()
+    ]
+    for name, tid, start_ns, end_ns, args in list(_events):
+        event = {
+            "name": name, "ph": "X", "pid": pid, "tid": tid,
+            "ts": (start_ns - _origin_ns) / 1000, "dur": (end_ns - start_ns) / 1000,
+        }
+        if args:
+            event["args"] = args
+        events.append(event)
+    return events
+
+
+def summary():
+    stats = defaultdict(lambda: [0, 0.0, 0.0])
+    for name, _, start_ns, end_ns, _ in list(_events):
+        ms = (end_ns - start_ns) / 1e6
+        s = stats[name]
+        s[0] += 1
+        s[1] += ms
+        s[2] = max(s[2], ms)
+    return {name: {"count": c, "total_ms": round(t, 3), "max_ms": round(m, 3)} for name, (c, t, m) in stats.items()}
+
+
+def print_summary(log=print):
+    stats = sorted(summary().items(), key=lambda item: -item[1]["total_ms"])
+    log(f"{'span':<24} {'n':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9}")
+    for name, s in stats:
+        log(f"{name:<24} {s['count']:>6} {s['total_ms']:>10.1f} {s['total_ms'] / s['count']:>9.2f} {s['max_ms']:>9.2f}")
+
+
+def save(folder, stem=None):
+    # Writes <stem>.json (the timeline) and, if cProfile ran, <stem>.prof.
+    os.makedirs(folder, exist_ok=True)
+    stem = stem or time.strftime("trace-%Y%m%d-%H%M%S")
+    paths = [os.path.join(folder, stem + ".json")]
+    with open(paths[0], "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace_events(), "displayTimeUnit": "ms"}, f)
+    if _profiler is not None:
+        paths.append(os.path.join(folder, stem + ".prof"))
+        _profiler.dump_stats(paths[1])
+    return paths
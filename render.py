@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+from PIL import Image, JpegImagePlugin
+
+from folder_model import processed_names
+
+BORDER_THICKNESS = 3
+
+
+def border_bands(x, y, w, h, thickness=BORDER_THICKNESS):
+    # The border grows outwards from the rectangle's edges, matching
+    # PIL's draw.rectangle([x-i, y-i, x+w+i, y+h+i]) for i in range(thickness).
+    t = thickness
+    left, top = x - (t - 1), y - (t - 1)
+    span_w, span_h = w + 2 * t - 1, h + 2 * t - 1
+    return [
+        (left, top, span_w, t),
+        (left, y + h, span_w, t),
+        (left, top, t, span_h),
+        (x + w, top, t, span_h),
+    ]
+
+
+def burn_rects(pixels, rects, thickness=BORDER_THICKNESS, color=(255, 0, 0)):
+    # Writes the borders of every (x, y, w, h) rect into an H x W x C uint8 array
+    # in place: four slice assignments per rectangle, clipped to the image.
+    height, width = pixels.shape[:2]
+    for x, y, w, h in rects:
+        for bx, by, bw, bh in border_bands(x, y, w, h, thickness):
+            x0, y0 = max(bx, 0), max(by, 0)
+            x1, y1 = min(bx + bw, width), min(by + bh, height)
+            if x0 < x1 and y0 < y1:
+                pixels[y0:y1, x0:x1, :len(color)] = color
+    return pixels
+
+
+def source_jpeg_options(path):
+    # Encoder options that reuse the source JPEG's quantization tables and chroma
+    # subsampling. Blocks the borders don't touch then re-quantize to (almost)
+    # the coefficients they had, instead of losing detail again at quality 75.
+    # Only the header is read.
+    with Image.open(path) as src:
+        if src.format != "JPEG":
+            return {}
+        options = {"qtables": src.quantization}
+        sampling = JpegImagePlugin.get_sampling(src)
+        if sampling >= 0:
+            options["subsampling"] = sampling
+        return options
+
+
+def render_file(folder, name, rects, keep_quality=False):
+    # Qt-free equivalent of the viewer's save: burn the rectangles into
+    # taged_<name>.jpg and rename the source to xxx_<name>.
+    path = os.path.join(folder, name)
+    taged, xxx = processed_names(name)
+    options = source_jpeg_options(path) if keep_quality else {}
+    with Image.open(path) as src:
+        pixels = np.array(src.convert("RGB"))
+    burn_rects(pixels, rects)
+    Image.fromarray(pixels).save(os.path.join(folder, taged), "JPEG", **options)
+    os.rename(path, os.path.join(folder, xxx))
@@ -0,0 +1,58 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from render import render_file
+from sidecar import pending_annotations
+
+
+def render_one(folder, name, rects, keep_quality):
+    try:
+        render_file(folder, name, rects, keep_quality)
+    except Exception as e:
+        return folder, name, f"{type(e).__name__}: {e}"
+    return folder, name, None
+
+
+def render_folders(folders, workers=None, keep_quality=False, log=print):
+    jobs = [
+        (folder, name, rects)
+        for folder in folders
+        for name, rects in sorted(pending_annotations(folder).items())
+    ]
+    total = len(jobs)
+    failures = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_one, folder, name, rects, keep_quality) for folder, name, rects in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            folder, name, error = future.result()
+            elapsed = time.perf_counter() - start
+            if error:
+                failures.append((os.path.join(folder, name), error))
+                log(f"❌ [{done}/{total}] {name}: {error}")
+            else:
+                log(f"💾 [{done}/{total}] {name}  ({done / elapsed:.1f} img/s)")
+    elapsed = time.perf_counter() - start
+    rate = (total - len(failures)) / elapsed if elapsed > 0 else 0.0
+    return total, failures, rate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render taged_ images from .imager-annotations.jsonl sidecars without a display."
+    )
+    parser.add_argument("folders", nargs="+", help="folders containing an annotation sidecar")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--keep-quality", action="store_true", help="re-encode with the source JPEG's tables")
+    args = parser.parse_args(argv)
+
+    total, failures, rate = render_folders(args.folders, args.workers, args.keep_quality)
+    print(f"✅ Rendered {total - len(failures)}/{total} images, {rate:.2f} images/second")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
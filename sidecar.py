@@ -0,0 +1,61 @@
+import json
+import os
+import time
+
+SIDECAR_NAME = ".imager-annotations.jsonl"
+
+
+def sidecar_path(folder):
+    return os.path.join(folder, SIDECAR_NAME)
+
+
+def append_annotation(folder, name, rects):
+    # One JSON line per save; later lines for the same file win. The source's size
+    # and mtime tie the record to this file, not to whatever later takes its name.
+    st = os.stat(os.path.join(folder, name))
+    record = {
+        "file": name,
+        "rects": [list(r) for r in rects],
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "time": round(time.time(), 3),
+    }
+    with open(sidecar_path(folder), "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def load_records(folder):
+    records = {}
+    try:
+        f = open(sidecar_path(folder), encoding="utf-8")
+    except FileNotFoundError:
+        return records
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                record["rects"] = [tuple(r) for r in record["rects"]]
+                records[record["file"]] = record
+            except (ValueError, KeyError, TypeError):
+                # A torn last line from an interrupted write; skip it.
+                continue
+    return records
+
+
+def record_matches(record, size, mtime_ns):
+    # Records written before files were stamped match on the name alone.
+    return record.get("size", size) == size and record.get("mtime_ns", mtime_ns) == mtime_ns
+
+
+def pending_annotations(folder):
+    # Annotations whose source is still there, unchanged, under its original
+    # name, i.e. not rendered yet. A new file that reuses a rendered name is not.
+    pending = {}
+    for name, record in load_records(folder).items():
+        try:
+            st = os.stat(os.path.join(folder, name))
+        except FileNotFoundError:
+            continue
+        if record_matches(record, st.st_size, st.st_mtime_ns):
+            pending[name] = record["rects"]
+    return pending
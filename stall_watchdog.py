@@ -0,0 +1,62 @@
+import sys
+import threading
+import time
+import traceback
+
+
+class StallWatchdog:
+    # Watches a thread that is expected to call beat() regularly (the GUI thread,
+    # from a timer on its event loop). When the beats stop for longer than
+    # `threshold_ms`, the watched thread's Python stack is sampled; once beats
+    # resume the stall is logged with its length and that stack. A stall still
+    # going after `hang_after_s` is logged straight away, as it may never end.
+    # A stall inside native code that holds the GIL is only sampled once the GIL
+    # is released, so its stack shows where Python resumed.
+
+    def __init__(self, threshold_ms=250, log=print, hang_after_s=5.0, ident=None):
+        self.threshold = threshold_ms / 1000
+        self.hang_after = hang_after_s
+        self.log = log
+        self.ident = ident or threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stalls = 0
+        self.worst_ms = 0.0
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="stall-watchdog", daemon=True)
+
+    def start(self):
+        self.last_beat = time.monotonic()
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def beat(self):
+        self.last_beat = time.monotonic()
+
+    def stack(self):
+        frame = sys._current_frames().get(self.ident)
+        return "".join(traceback.format_stack(frame)) if frame is not None else "  (no Python frame)\n"
+
+    def run(self):
+        stalled_since = None
+        stack = ""
+        hang_reported = False
+        while not self.stopping.wait(self.threshold / 4):
+            last = self.last_beat
+            if stalled_since is not None and last != stalled_since:
+                self.report((last - stalled_since) * 1000, stack)
+                stalled_since = None
+            silent = time.monotonic() - last
+            if stalled_since is None and silent > self.threshold:
+                stalled_since, stack, hang_reported = last, self.stack(), False
+            elif stalled_since is not None and not hang_reported and silent > self.hang_after:
+                hang_reported = True
+                self.log(f"🧊 UI thread unresponsive for {silent * 1000:.0f} ms and counting, at:\n{self.stack()}")
+
+    def report(self, ms, stack):
+        self.stalls += 1
+        self.worst_ms = max(self.worst_ms, ms)
+        self.log(f"🐢 UI thread stalled for {ms:.0f} ms, at:\n{stack}")
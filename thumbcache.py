@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_path():
+    if sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    elif os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(base, "imager", "thumbnails.sqlite3")
+
+
+class ThumbnailCache:
+    # Encoded thumbnails in a single SQLite file, keyed on path + file size + mtime.
+    # Least recently used entries are evicted once the stored bytes exceed max_bytes.
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or default_cache_path()
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, "
+            "data BLOB, bytes INTEGER, atime REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS thumbnails_atime ON thumbnails (atime)")
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(bytes), 0) FROM thumbnails").fetchone()[0]
+
+    def get(self, path, size, mtime):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT data FROM thumbnails WHERE path = ? AND size = ? AND mtime = ?",
+                (path, size, mtime),
+            ).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE thumbnails SET atime = ? WHERE path = ?", (time.time(), path))
+            return bytes(row[0])
+
+    def put(self, path, size, mtime, data):
+        with self.lock:
+            old = self.db.execute("SELECT bytes FROM thumbnails WHERE path = ?", (path,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO thumbnails (path, size, mtime, data, bytes, atime) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, size, mtime, sqlite3.Binary(data), len(data), time.time()),
+            )
+            self.total_bytes += len(data) - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Trim to 90% of the budget so eviction doesn't run on every insert.
+        target = self.max_bytes * 0.9
+        rows = self.db.execute("SELECT path, bytes FROM thumbnails ORDER BY atime").fetchall()
+        doomed = []
+        for path, nbytes in rows:
+            if self.total_bytes <= target:
+                break
+            doomed.append((path,))
+            self.total_bytes -= nbytes
+        self.db.executemany("DELETE FROM thumbnails WHERE path = ?", doomed)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def open_default_cache():
+    try:
+        return ThumbnailCache()
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️ Thumbnail cache disabled: {e}")
+        return None